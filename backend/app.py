@@ -1,14 +1,22 @@
 from flask import Flask
 from flask_cors import CORS  
+from werkzeug.middleware.proxy_fix import ProxyFix
 from .database import init_db, db
 from .routes.auth_routes import auth_bp
 from .routes.game_routes import game_bp
 from .routes.user_routes import user_bp
+from .routes.leaderboard_routes import leaderboard_bp
+from .config import TRUSTED_PROXY_HOPS
 import os
 
 def create_app():
     app = Flask(__name__)
 
+    # remote_addr is what rate limiting keys guests on; only take it from
+    # X-Forwarded-For when that header is set by our own proxies
+    if TRUSTED_PROXY_HOPS:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+
     app.config["SECRET_KEY"] = os.getenv("PLAYWELL_SECRET_KEY", "dev-secret")
     app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL")
 
@@ -23,6 +31,7 @@ def create_app():
     app.register_blueprint(auth_bp, url_prefix="/api")
     app.register_blueprint(game_bp, url_prefix="/api")
     app.register_blueprint(user_bp, url_prefix="/api")
+    app.register_blueprint(leaderboard_bp, url_prefix="/api")
 
     @app.route("/")
     def root():
@@ -35,4 +44,15 @@ def create_app():
         db.session.execute(text("SELECT 1"))
         return {"db": "ok"}
 
+    from backend.ml.drift import monitor as drift_monitor, recent_scores
+
+    @app.route("/health/drift")
+    def drift_health():
+        if drift_monitor is None:
+            return {"error": "Drift monitoring disabled or no reference profile"}, 503
+        return {
+            "reference_created_at": drift_monitor.profile.get("created_at"),
+            "windows": recent_scores()
+        }
+
     return app
@@ -0,0 +1,402 @@
+# backend/archive.py
+#
+# Time partitioning and cold archive for game_session and the tables keyed
+# by it (analysis_result, session_trials).
+#
+#   python -m backend.archive partition          # Postgres: convert game_session
+#                                                #   to monthly RANGE partitions
+#   python -m backend.archive ensure-partitions  # Postgres: create upcoming months
+#   python -m backend.archive archive [--horizon-months N] [--export-only]
+#
+# `archive` moves every month older than the horizon into
+# ARCHIVE_DIR/game_session/YYYY-MM.parquet (zstd, sorted by user_id so
+# per-user reads prune row groups), verifies the file, then drops the
+# partition (Postgres) or deletes the month's rows (SQLite / unpartitioned).
+# Archived sessions stay reachable through read_archived_history(), which
+# /user/history uses when called with ?include_archive=1.
+#
+# With DATABASE_SHARD_URLS every command runs once per shard and archive
+# files are tagged with the shard (YYYY-MM.shard0.parquet); session ids are
+# only unique per shard.
+
+import argparse
+import glob
+import os
+from datetime import datetime
+
+from sqlalchemy import text
+
+from backend.config import ARCHIVE_DIR, ARCHIVE_HORIZON_MONTHS, PARTITION_MONTHS_AHEAD
+from backend.database import db
+from backend.sharding import session_engines, sharding_enabled
+
+SESSION_TABLE = "game_session"
+PARTITION_PREFIX = "game_session_p"
+
+ARCHIVE_QUERY = """
+    SELECT s.id AS session_id, s.user_id, s.game_type,
+           s.reaction_time_avg, s.memory_score, s.errors, s.duration,
+           s.created_at, a.stress_level, a.cognitive_score, a.recommendations,
+           t.reaction_ms AS trial_reaction_ms, t.correct AS trial_correct
+    FROM {table} s
+    LEFT JOIN analysis_result a ON a.session_id = s.id
+    LEFT JOIN session_trials t ON t.session_id = s.id
+    WHERE s.created_at >= :start AND s.created_at < :end
+    ORDER BY s.user_id, s.id
+"""
+
+CHUNK_ROWS = 100_000
+
+# Tables keyed by game_session.id that are archived/deleted with their session
+SESSION_CHILD_TABLES = ("analysis_result", "session_trials")
+
+
+def _archive_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("session_id", pa.int64()),
+        ("user_id", pa.int64()),
+        ("game_type", pa.string()),
+        ("reaction_time_avg", pa.float64()),
+        ("memory_score", pa.float64()),
+        ("errors", pa.int64()),
+        ("duration", pa.float64()),
+        ("created_at", pa.timestamp("us")),
+        ("stress_level", pa.string()),
+        ("cognitive_score", pa.float64()),
+        ("recommendations", pa.string()),
+        # packed arrays as stored in session_trials (see backend/trials.py)
+        ("trial_reaction_ms", pa.binary()),
+        ("trial_correct", pa.binary()),
+    ])
+
+
+# ---------------------------------------------------------------------------
+# Month helpers
+# ---------------------------------------------------------------------------
+
+def month_start(dt):
+    return datetime(dt.year, dt.month, 1)
+
+
+def add_months(dt, n):
+    index = dt.year * 12 + (dt.month - 1) + n
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def archive_cutoff(horizon_months, now=None):
+    return add_months(month_start(now or datetime.utcnow()), -horizon_months)
+
+
+def partition_name(start):
+    return f"{PARTITION_PREFIX}{start:%Y%m}"
+
+
+def archive_path(start, shard=None):
+    suffix = f".shard{shard}" if shard is not None else ""
+    return os.path.join(ARCHIVE_DIR, SESSION_TABLE, f"{start:%Y-%m}{suffix}.parquet")
+
+
+# ---------------------------------------------------------------------------
+# Postgres partitioning
+# ---------------------------------------------------------------------------
+
+def is_postgres(engine=None):
+    return (engine or db.engine).dialect.name == "postgresql"
+
+
+def is_partitioned(conn):
+    return conn.execute(text("""
+        SELECT 1 FROM pg_partitioned_table p
+        JOIN pg_class c ON c.oid = p.partrelid
+        WHERE c.relname = :name
+    """), {"name": SESSION_TABLE}).first() is not None
+
+
+def list_partitions(conn):
+    rows = conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = :name
+    """), {"name": SESSION_TABLE}).scalars()
+
+    partitions = {}
+    for name in rows:
+        suffix = name[len(PARTITION_PREFIX):]
+        if name.startswith(PARTITION_PREFIX) and suffix.isdigit() and len(suffix) == 6:
+            partitions[datetime(int(suffix[:4]), int(suffix[4:]), 1)] = name
+    return partitions
+
+
+def create_partition(conn, start):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start)} "
+        f"PARTITION OF {SESSION_TABLE} "
+        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{add_months(start, 1):%Y-%m-%d}')"
+    ))
+
+
+def ensure_partitions(months_ahead=PARTITION_MONTHS_AHEAD):
+    for engine in session_engines():
+        with engine.begin() as conn:
+            if not is_partitioned(conn):
+                raise SystemExit("game_session is not partitioned; run `partition` first")
+            current = month_start(datetime.utcnow())
+            for n in range(months_ahead + 1):
+                create_partition(conn, add_months(current, n))
+
+
+def partition_table(keep_legacy=False):
+    """One-off migration of a plain game_session table to monthly partitions.
+
+    Runs in a single transaction (the table is locked while rows are
+    copied). The primary key becomes (id, created_at), as Postgres requires
+    the partition key in it, so the FKs from analysis_result and
+    session_trials are dropped; archive() removes those rows together with
+    their sessions.
+    """
+    for engine in session_engines():
+        if not is_postgres(engine):
+            raise SystemExit("partitioning is only supported on PostgreSQL")
+        _partition_table(engine, keep_legacy)
+
+
+def _partition_table(engine, keep_legacy):
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            print(f"{engine.url.database}: game_session is already partitioned")
+            return
+
+        for table in SESSION_CHILD_TABLES:
+            conn.execute(text(
+                f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_session_id_fkey"
+            ))
+        conn.execute(text(
+            "UPDATE game_session SET created_at = now() AT TIME ZONE 'utc' "
+            "WHERE created_at IS NULL"
+        ))
+        conn.execute(text("ALTER TABLE game_session RENAME TO game_session_legacy"))
+        conn.execute(text(
+            "ALTER INDEX IF EXISTS game_session_pkey RENAME TO game_session_legacy_pkey"
+        ))
+        conn.execute(text(
+            "CREATE TABLE game_session (LIKE game_session_legacy INCLUDING DEFAULTS) "
+            "PARTITION BY RANGE (created_at)"
+        ))
+        conn.execute(text("ALTER TABLE game_session ALTER COLUMN created_at SET NOT NULL"))
+        conn.execute(text("ALTER TABLE game_session ADD PRIMARY KEY (id, created_at)"))
+        if engine is db.engine:
+            # Shards don't hold the user table
+            conn.execute(text(
+                'ALTER TABLE game_session ADD FOREIGN KEY (user_id) REFERENCES "user" (id)'
+            ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_game_session_user_id_id "
+            "ON game_session (user_id, id)"
+        ))
+        conn.execute(text("ALTER SEQUENCE game_session_id_seq OWNED BY game_session.id"))
+
+        lo, hi = conn.execute(text(
+            "SELECT MIN(created_at), MAX(created_at) FROM game_session_legacy"
+        )).first()
+        now = datetime.utcnow()
+        start = month_start(lo or now)
+        end = add_months(month_start(max(hi or now, now)), PARTITION_MONTHS_AHEAD)
+        while start <= end:
+            create_partition(conn, start)
+            start = add_months(start, 1)
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS game_session_default "
+            "PARTITION OF game_session DEFAULT"
+        ))
+
+        conn.execute(text("INSERT INTO game_session SELECT * FROM game_session_legacy"))
+        if not keep_legacy:
+            conn.execute(text("DROP TABLE game_session_legacy"))
+
+    print(f"{engine.url.database}: game_session converted to monthly partitions")
+
+
+# ---------------------------------------------------------------------------
+# Archive
+# ---------------------------------------------------------------------------
+
+def export_month(conn, table, start, path):
+    """Writes one month to `path` and returns the number of rows written
+    (empty months leave no file)."""
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    schema = _archive_schema()
+
+    rows = 0
+    with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+        for chunk in pd.read_sql(
+            text(ARCHIVE_QUERY.format(table=table)),
+            conn,
+            params={"start": start, "end": add_months(start, 1)},
+            chunksize=CHUNK_ROWS,
+        ):
+            chunk["created_at"] = pd.to_datetime(chunk["created_at"])
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+
+    if rows == 0:
+        os.remove(tmp_path)
+        return 0
+
+    if pq.ParquetFile(tmp_path).metadata.num_rows != rows:
+        os.remove(tmp_path)
+        raise RuntimeError(f"archive verification failed for {path}")
+
+    if os.path.exists(path):
+        # A previous run wrote this month but didn't finish deleting it:
+        # the database still holds every row, so the new file supersedes it.
+        os.remove(path)
+    os.replace(tmp_path, path)
+    return rows
+
+
+def _archive_partition(engine, start, name, path, export_only):
+    with engine.begin() as conn:
+        rows = export_month(conn, name, start, path)
+        if export_only:
+            return rows
+        conn.execute(text(f"ALTER TABLE {SESSION_TABLE} DETACH PARTITION {name}"))
+        for child in SESSION_CHILD_TABLES:
+            conn.execute(text(
+                f"DELETE FROM {child} WHERE session_id IN (SELECT id FROM {name})"
+            ))
+        conn.execute(text(f"DROP TABLE {name}"))
+    return rows
+
+
+def _archive_range(engine, start, path, export_only):
+    params = {"start": start, "end": add_months(start, 1)}
+    with engine.begin() as conn:
+        rows = export_month(conn, SESSION_TABLE, start, path)
+        if export_only:
+            return rows
+        for child in SESSION_CHILD_TABLES:
+            conn.execute(text(f"""
+                DELETE FROM {child} WHERE session_id IN (
+                    SELECT id FROM game_session
+                    WHERE created_at >= :start AND created_at < :end
+                )
+            """), params)
+        conn.execute(text(
+            "DELETE FROM game_session WHERE created_at >= :start AND created_at < :end"
+        ), params)
+    return rows
+
+
+def _archive_months(engine, cutoff):
+    """{month start: partition name or None} for the months to archive."""
+    with engine.connect() as conn:
+        if is_postgres(engine) and is_partitioned(conn):
+            return True, {s: n for s, n in list_partitions(conn).items() if s < cutoff}
+
+        oldest = conn.execute(text(
+            "SELECT MIN(created_at) FROM game_session"
+        )).scalar()
+        months = {}
+        if oldest is not None:
+            if isinstance(oldest, str):  # SQLite returns text
+                oldest = datetime.fromisoformat(oldest)
+            start = month_start(oldest)
+            while start < cutoff:
+                months[start] = None
+                start = add_months(start, 1)
+        return False, months
+
+
+def archive(horizon_months=ARCHIVE_HORIZON_MONTHS, export_only=False):
+    cutoff = archive_cutoff(horizon_months)
+
+    total = 0
+    for shard, engine in enumerate(session_engines()):
+        partitioned, months = _archive_months(engine, cutoff)
+        for start in sorted(months):
+            path = archive_path(start, shard if sharding_enabled() else None)
+            if partitioned:
+                rows = _archive_partition(engine, start, months[start], path, export_only)
+            else:
+                rows = _archive_range(engine, start, path, export_only)
+            total += rows
+            if rows:
+                print(f"{start:%Y-%m}: {rows} sessions -> {path}")
+
+    if total and not export_only:
+        # Hot history changed shape for the affected users; invalidate ETags
+        with db.engine.begin() as conn:
+            conn.execute(text(
+                "UPDATE user_data_version SET version = version + 1"
+            ))
+
+    print(f"archived {total} sessions older than {cutoff:%Y-%m-%d}"
+          + (" (export only, rows kept)" if export_only else ""))
+    return total
+
+
+def read_archived_history(user_id):
+    """Archived sessions of one user, newest first, shaped like /user/history."""
+    files = glob.glob(os.path.join(ARCHIVE_DIR, SESSION_TABLE, "*.parquet"))
+    if not files:
+        return []
+
+    import pyarrow.dataset as ds
+
+    table = ds.dataset(files, format="parquet").to_table(
+        filter=ds.field("user_id") == user_id
+    )
+    rows = table.to_pylist()
+    rows.sort(key=lambda r: r["session_id"], reverse=True)
+
+    return [{
+        "session_id": r["session_id"],
+        "game_type": r["game_type"],
+        "reaction_time_avg": r["reaction_time_avg"],
+        "memory_score": r["memory_score"],
+        "errors": r["errors"],
+        "duration": r["duration"],
+        "created_at": r["created_at"].strftime("%Y-%m-%d %H:%M:%S") if r["created_at"] else None,
+        "stress_level": r["stress_level"],
+        "cognitive_score": r["cognitive_score"],
+        "recommendations": r["recommendations"],
+        "archived": True
+    } for r in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PlayWell session partitioning / archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("partition", help="convert game_session to monthly partitions (Postgres)")
+    p.add_argument("--keep-legacy", action="store_true")
+
+    p = sub.add_parser("ensure-partitions", help="create upcoming monthly partitions")
+    p.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+
+    p = sub.add_parser("archive", help="move old months to Parquet")
+    p.add_argument("--horizon-months", type=int, default=ARCHIVE_HORIZON_MONTHS)
+    p.add_argument("--export-only", action="store_true")
+
+    args = parser.parse_args(argv)
+
+    from backend.app import create_app
+    app = create_app()
+    with app.app_context():
+        if args.command == "partition":
+            partition_table(keep_legacy=args.keep_legacy)
+        elif args.command == "ensure-partitions":
+            ensure_partitions(args.months_ahead)
+        else:
+            archive(args.horizon_months, export_only=args.export_only)
+
+
+if __name__ == "__main__":
+    main()
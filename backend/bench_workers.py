@@ -0,0 +1,158 @@
+# backend/bench_workers.py
+#
+# Compares serving modes by concurrent connections sustained per GB of RAM.
+#
+#   python -m backend.bench_workers --modes sync,gthread,gevent --levels 8,32,128
+#
+# For each mode a local gunicorn is started against DATABASE_URL (admission
+# control off so raw capacity is measured), backend.loadtest is run at each
+# concurrency level, and the proportional set size (PSS) of the master plus
+# workers is sampled afterwards. A level "passes" when its error rate and
+# p95 latency stay under the given limits; the report gives the highest
+# passing level and connections/GB at that level, as JSON.
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from backend import loadtest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONF = os.path.join(ROOT, "backend", "gunicorn_conf.py")
+
+MODES = {
+    # the current deployment: plain sync workers, app loaded per worker
+    "sync": {"args": ["-k", "sync"], "env": {}},
+    "gthread": {"args": ["-c", CONF], "env": {"PLAYWELL_WORKER_CLASS": "gthread"}},
+    "gevent": {"args": ["-c", CONF], "env": {"PLAYWELL_WORKER_CLASS": "gevent"}},
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def process_tree(root_pid):
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def memory_kb(pid):
+    # PSS splits shared (copy-on-write) pages between processes, so summing
+    # it over master + workers doesn't double count preloaded models
+    for path, field in ((f"/proc/{pid}/smaps_rollup", "Pss:"), (f"/proc/{pid}/status", "VmRSS:")):
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith(field):
+                        return int(line.split()[1])
+        except OSError:
+            continue
+    return 0
+
+
+def wait_ready(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + "/health/db", timeout=2) as r:
+                if r.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"server at {base_url} did not become ready")
+
+
+def bench_mode(name, args):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, PLAYWELL_ADMISSION="0", WEB_CONCURRENCY=str(args.workers))
+    env.update(MODES[name]["env"])
+
+    cmd = [sys.executable, "-m", "gunicorn", *MODES[name]["args"],
+           "-w", str(args.workers), "-b", f"127.0.0.1:{port}", "wsgi:app"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    results = []
+    try:
+        wait_ready(base_url)
+        for level in args.levels:
+            report = loadtest.run(loadtest.parse_args([
+                "--url", base_url, "--scenario", args.scenario,
+                "--concurrency", str(level), "--duration", str(args.duration),
+            ]))
+            mem_mb = sum(memory_kb(p) for p in process_tree(proc.pid)) / 1024.0
+            overall = report["overall"]
+            passed = (
+                overall["error_rate"] <= args.max_error_rate
+                and overall["latency_ms"]["p95"] <= args.max_p95_ms
+            )
+            results.append({
+                "concurrency": level,
+                "passed": passed,
+                "memory_mb": round(mem_mb, 1),
+                "connections_per_gb": round(level / (mem_mb / 1024.0), 1) if mem_mb else None,
+                "throughput_rps": overall["throughput_rps"],
+                "error_rate": overall["error_rate"],
+                "latency_ms": overall["latency_ms"],
+            })
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    best = max((r for r in results if r["passed"]), key=lambda r: r["concurrency"], default=None)
+    return {
+        "mode": name,
+        "workers": args.workers,
+        "max_sustained_concurrency": best["concurrency"] if best else 0,
+        "connections_per_gb": best["connections_per_gb"] if best else 0,
+        "levels": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark gunicorn serving modes")
+    parser.add_argument("--modes", default="sync,gthread,gevent")
+    parser.add_argument("--levels", default="8,32,128,512")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--scenario", default="mixed", choices=sorted(loadtest.SCENARIOS))
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--max-p95-ms", type=float, default=1000)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+    args.levels = [int(x) for x in args.levels.split(",")]
+
+    report = [bench_mode(m, args) for m in args.modes.split(",")]
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+# backend/cohorts.py
+#
+# Peer percentiles per (game_type, age band, gender) from fixed-bin
+# histograms, so ranking a player never scans game_session.
+#
+# Each cohort/metric row stores cumulative bin counts (packed uint32), so
+# a lookup is a binary search over the bin edges plus two array reads.
+# Submits don't touch that row: after the submit commits, each value bumps
+# a pending per-bin counter (cohort_bin_count) with an atomic UPDATE ...
+# SET count = count + 1 in a short transaction of its own. `compact`
+# folds the pending counters into the arrays; until then a lookup adds
+# them with one aggregate over the few pending rows.
+#
+#   python -m backend.cohorts compact    # fold pending counts (run from cron)
+#   python -m backend.cohorts rebuild    # recompute every histogram from raw rows
+
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import case, func, text
+from sqlalchemy.exc import IntegrityError
+
+from backend.database import db
+from backend.ml.inference import normalize_gender
+from backend.models.cohort_model import CohortHistogram, CohortBinCount
+from backend.sharding import session_engines
+
+# metric -> bin edges (values outside are clipped into the first/last bin)
+METRIC_BINS = {
+    "reaction_time_avg": np.linspace(0.0, 2000.0, 201),   # 10 ms bins
+    "memory_score": np.linspace(0.0, 100.0, 101),
+    "cognitive_score": np.linspace(0.0, 100.0, 101),
+}
+
+# Metrics where a lower value is better
+LOWER_IS_BETTER = {"reaction_time_avg"}
+
+COUNT_DTYPE = np.dtype("<u4")
+
+AGE_BANDS = [(0, 17, "<18"), (18, 29, "18-29"), (30, 39, "30-39"),
+             (40, 49, "40-49"), (50, 59, "50-59"), (60, 200, "60+")]
+
+
+def age_band(age):
+    # Same default as submit_game (`age or DEFAULT_AGE`); rebuild frames
+    # carry NULL ages as NaN
+    age = 25 if pd.isna(age) or not age else int(age)
+    for lo, hi, label in AGE_BANDS:
+        if lo <= age <= hi:
+            return label
+    return AGE_BANDS[-1][2]
+
+
+def bin_index(metric, values):
+    edges = METRIC_BINS[metric]
+    idx = np.searchsorted(edges, values, side="right") - 1
+    return np.clip(idx, 0, len(edges) - 2)
+
+
+def _decode(blob):
+    return np.frombuffer(blob, dtype=COUNT_DTYPE)
+
+
+def _encode(cum):
+    return cum.astype(COUNT_DTYPE, copy=False).tobytes()
+
+
+def _counts(metric, rows):
+    counts = np.zeros(len(METRIC_BINS[metric]) - 1, dtype=np.int64)
+    for b, count in rows:
+        if 0 <= b < len(counts):
+            counts[b] += count
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# Incremental update (called from submit_game, after its commit)
+# ---------------------------------------------------------------------------
+
+def _bump(conn, key):
+    t = CohortBinCount.__table__
+    return conn.execute(
+        t.update()
+        .where(*[t.c[k] == v for k, v in key.items()])
+        .values(count=t.c.count + 1)
+    ).rowcount
+
+
+def record_values(game_type, age, gender, values):
+    """values: {metric: value or None}. Uses its own transaction; call it
+    once the session is committed."""
+    band = age_band(age)
+    gender = normalize_gender(gender)
+    keys = [
+        {"game_type": game_type, "age_band": band, "gender": gender,
+         "metric": metric, "bin": int(bin_index(metric, value))}
+        for metric, value in values.items()
+        if value is not None and metric in METRIC_BINS
+    ]
+    if not keys:
+        return
+
+    with db.engine.begin() as conn:
+        for key in keys:
+            if _bump(conn, key):
+                continue
+            try:
+                with conn.begin_nested():
+                    conn.execute(CohortBinCount.__table__.insert().values(**key, count=1))
+            except IntegrityError:
+                # Created concurrently by another worker
+                _bump(conn, key)
+
+
+# ---------------------------------------------------------------------------
+# Lookup
+# ---------------------------------------------------------------------------
+
+def _pending(key, b):
+    """(below, same, total) from counts not yet compacted."""
+    t = CohortBinCount
+    return db.session.query(
+        func.coalesce(func.sum(case((t.bin < b, t.count), else_=0)), 0),
+        func.coalesce(func.sum(case((t.bin == b, t.count), else_=0)), 0),
+        func.coalesce(func.sum(t.count), 0),
+    ).filter_by(**key).one()
+
+
+def percentile(game_type, age, gender, metric, value):
+    if value is None or metric not in METRIC_BINS:
+        return None
+
+    key = {
+        "game_type": game_type,
+        "age_band": age_band(age),
+        "gender": normalize_gender(gender),
+        "metric": metric,
+    }
+    b = int(bin_index(metric, value))
+
+    below = same = total = 0
+    # Snapshot before pending: a compaction in between can undercount
+    # briefly, never double count
+    row = CohortHistogram.query.filter_by(**key).first()
+    if row is not None:
+        cum = _decode(row.cum_counts)
+        total = int(cum[-1])
+        below = int(cum[b - 1]) if b > 0 else 0
+        same = int(cum[b]) - below
+
+    p_below, p_same, p_total = _pending(key, b)
+    below, same, total = below + int(p_below), same + int(p_same), total + int(p_total)
+    if total == 0:
+        return None
+
+    # Share of peers at or below this value (ties count half)
+    pct = 100.0 * (below + 0.5 * same) / total
+    better_than = 100.0 - pct if metric in LOWER_IS_BETTER else pct
+
+    return {
+        "value": value,
+        "percentile": round(pct, 1),
+        "better_than": round(better_than, 1),
+        "cohort_size": total,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Compaction
+# ---------------------------------------------------------------------------
+
+COHORT_KEY = ("game_type", "age_band", "gender", "metric")
+
+
+def _locked_histogram(key):
+    query = CohortHistogram.query.filter_by(**key).with_for_update()
+    row = query.first()
+    if row is not None:
+        return row
+
+    try:
+        with db.session.begin_nested():
+            row = CohortHistogram(
+                **key, cum_counts=_encode(np.zeros(len(METRIC_BINS[key["metric"]]) - 1))
+            )
+            db.session.add(row)
+    except IntegrityError:
+        # Created concurrently by another compaction
+        row = query.first()
+    return row
+
+
+def compact():
+    """Folds pending per-bin counts into the cumulative arrays, one
+    short transaction per cohort/metric."""
+    keys = db.session.query(*[getattr(CohortBinCount, c) for c in COHORT_KEY]).distinct().all()
+    db.session.commit()
+
+    folded = 0
+    for values in keys:
+        key = dict(zip(COHORT_KEY, values))
+        if key["metric"] not in METRIC_BINS:
+            continue
+        row = _locked_histogram(key)
+        pending = CohortBinCount.query.filter_by(**key).with_for_update().all()
+        if pending:
+            counts = _counts(key["metric"], [(p.bin, p.count) for p in pending])
+            row.cum_counts = _encode(_decode(row.cum_counts).astype(np.int64) + np.cumsum(counts))
+            row.updated_at = datetime.utcnow()
+            CohortBinCount.query.filter(
+                CohortBinCount.id.in_([p.id for p in pending])
+            ).delete(synchronize_session=False)
+            folded += int(counts.sum())
+        db.session.commit()
+
+    print(f"compacted {folded} pending values into {len(keys)} histograms")
+
+
+# ---------------------------------------------------------------------------
+# Offline rebuild
+# ---------------------------------------------------------------------------
+
+# Sessions may live on shards while users stay on the primary, so the
+# user attributes are joined in pandas rather than in SQL
+REBUILD_QUERY = """
+    SELECT s.game_type, s.user_id,
+           s.reaction_time_avg, s.memory_score, a.cognitive_score
+    FROM game_session s
+    LEFT JOIN analysis_result a ON a.session_id = s.id
+"""
+
+USERS_QUERY = 'SELECT id AS user_id, age, gender FROM "user"'
+
+
+def rebuild(chunksize=100_000):
+    with db.engine.connect() as conn:
+        users = pd.read_sql(text(USERS_QUERY), conn).set_index("user_id")
+    users["age_band"] = users["age"].map(age_band)
+    users["gender"] = users["gender"].map(normalize_gender)
+
+    counts = {}
+    rows_seen = 0
+    for engine in session_engines():
+        with engine.connect() as conn:
+            for chunk in pd.read_sql(text(REBUILD_QUERY), conn, chunksize=chunksize):
+                rows_seen += len(chunk)
+                chunk = chunk.join(users[["age_band", "gender"]], on="user_id", how="inner")
+
+                for (game_type, band, gender), group in chunk.groupby(
+                    ["game_type", "age_band", "gender"]
+                ):
+                    for metric in METRIC_BINS:
+                        values = group[metric].dropna().to_numpy(dtype=float)
+                        if not len(values):
+                            continue
+                        key = (game_type, band, gender, metric)
+                        hist = counts.setdefault(key, np.zeros(len(METRIC_BINS[metric]) - 1, np.int64))
+                        hist += np.bincount(bin_index(metric, values), minlength=len(hist))
+
+    now = datetime.utcnow()
+    CohortBinCount.query.delete()
+    CohortHistogram.query.delete()
+    db.session.add_all([
+        CohortHistogram(
+            game_type=game_type, age_band=band, gender=gender, metric=metric,
+            cum_counts=_encode(np.cumsum(hist)), updated_at=now
+        )
+        for (game_type, band, gender, metric), hist in counts.items()
+    ])
+    db.session.commit()
+
+    print(f"rebuilt {len(counts)} histograms from {rows_seen} sessions")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PlayWell cohort histograms")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="recompute all histograms from game_session")
+    sub.add_parser("compact", help="fold pending per-bin counts into the histograms")
+    args = parser.parse_args(argv)
+
+    from backend.app import create_app
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if args.command == "compact":
+            compact()
+        else:
+            rebuild()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,88 @@
 import os
+import tempfile
 
 SECRET_KEY = os.getenv("PLAYWELL_SECRET_KEY", "dev-secret-key")
 SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
+
+# Admission control / rate limiting (shared across gunicorn workers via SQLite)
+ADMISSION_ENABLED = os.getenv("PLAYWELL_ADMISSION", "1") != "0"
+SHARED_STORE_PATH = os.getenv(
+    "PLAYWELL_SHARED_STORE",
+    os.path.join(tempfile.gettempdir(), "playwell_shared.db")
+)
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("PLAYWELL_QUEUE_TIMEOUT", "2.0"))
+ADMISSION_RETRY_AFTER = int(os.getenv("PLAYWELL_RETRY_AFTER", "1"))
+
+# Reverse proxies in front of the app whose X-Forwarded-For is trusted
+# (0 = clients connect directly; the header is ignored)
+TRUSTED_PROXY_HOPS = int(os.getenv("PLAYWELL_TRUSTED_PROXY_HOPS", "0"))
+
+PREDICT_MAX_CONCURRENT = int(os.getenv("PLAYWELL_PREDICT_MAX_CONCURRENT", "4"))
+PREDICT_MAX_QUEUE = int(os.getenv("PLAYWELL_PREDICT_MAX_QUEUE", "16"))
+PREDICT_RATE = float(os.getenv("PLAYWELL_PREDICT_RATE", "2"))
+PREDICT_BURST = float(os.getenv("PLAYWELL_PREDICT_BURST", "10"))
+PREDICT_DEGRADE = os.getenv("PLAYWELL_PREDICT_DEGRADE", "1") != "0"
+
+SUBMIT_MAX_CONCURRENT = int(os.getenv("PLAYWELL_SUBMIT_MAX_CONCURRENT", "4"))
+SUBMIT_MAX_QUEUE = int(os.getenv("PLAYWELL_SUBMIT_MAX_QUEUE", "16"))
+SUBMIT_RATE = float(os.getenv("PLAYWELL_SUBMIT_RATE", "1"))
+SUBMIT_BURST = float(os.getenv("PLAYWELL_SUBMIT_BURST", "5"))
+
+# Per-user dashboard response cache / compression
+# Budget in bytes for cached bodies plus their compressed variants;
+# bodies larger than RESPONSE_CACHE_MAX_ENTRY are served but not cached
+RESPONSE_CACHE_BYTES = int(os.getenv("PLAYWELL_RESPONSE_CACHE_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_MAX_ENTRY = int(os.getenv("PLAYWELL_RESPONSE_CACHE_MAX_ENTRY", str(1024 * 1024)))
+COMPRESS_MIN_SIZE = int(os.getenv("PLAYWELL_COMPRESS_MIN_SIZE", "1024"))
+
+# Serving mode: CPU-bound work (model inference, password hashing) runs
+# through a bounded pool so it never blocks the gevent hub and never
+# oversubscribes cores under gthread workers.
+CPU_POOL_SIZE = int(os.getenv("PLAYWELL_CPU_POOL_SIZE", str(os.cpu_count() or 2)))
+
+# Primary engine pool (size it to threads/greenlets per worker)
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
+DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+DATABASE_PRE_PING = os.getenv("DATABASE_PRE_PING", "1") != "0"
+
+# Read replicas (comma-separated URLs). Read-only dashboard routes use them
+# round-robin, except right after the user's own write.
+DATABASE_REPLICA_URLS = [
+    u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()
+]
+REPLICA_STICKY_SECONDS = float(os.getenv("PLAYWELL_REPLICA_STICKY_SECONDS", "5"))
+REPLICA_HEALTH_INTERVAL = float(os.getenv("PLAYWELL_REPLICA_HEALTH_INTERVAL", "10"))
+
+# Cold archive of old game sessions (Parquet)
+ARCHIVE_DIR = os.getenv(
+    "PLAYWELL_ARCHIVE_DIR",
+    os.path.join(os.path.dirname(__file__), "instance", "archive")
+)
+ARCHIVE_HORIZON_MONTHS = int(os.getenv("PLAYWELL_ARCHIVE_HORIZON_MONTHS", "12"))
+PARTITION_MONTHS_AHEAD = int(os.getenv("PLAYWELL_PARTITION_MONTHS_AHEAD", "3"))
+
+# Leaderboards
+LEADERBOARD_SIZE = int(os.getenv("PLAYWELL_LEADERBOARD_SIZE", "100"))
+LEADERBOARD_CACHE_TTL = float(os.getenv("PLAYWELL_LEADERBOARD_CACHE_TTL", "30"))
+LEADERBOARD_KEEP_DAYS = int(os.getenv("PLAYWELL_LEADERBOARD_KEEP_DAYS", "14"))
+
+# Input / prediction drift monitoring
+DRIFT_ENABLED = os.getenv("PLAYWELL_DRIFT", "1") != "0"
+DRIFT_WINDOW_SECONDS = int(os.getenv("PLAYWELL_DRIFT_WINDOW_SECONDS", "3600"))
+DRIFT_FLUSH_INTERVAL = float(os.getenv("PLAYWELL_DRIFT_FLUSH_INTERVAL", "30"))
+DRIFT_KEEP_WINDOWS = int(os.getenv("PLAYWELL_DRIFT_KEEP_WINDOWS", "48"))
+DRIFT_PSI_ALERT = float(os.getenv("PLAYWELL_DRIFT_PSI_ALERT", "0.2"))
+
+# User-id sharding of game_session / analysis_result / session_trials
+# (comma-separated URLs; empty = everything on the primary)
+DATABASE_SHARD_URLS = [
+    u.strip() for u in os.getenv("DATABASE_SHARD_URLS", "").split(",") if u.strip()
+]
+SHARD_DIRECTORY_TTL = float(os.getenv("PLAYWELL_SHARD_DIRECTORY_TTL", "30"))
+
+# Offline re-scoring job (python -m backend.rescore)
+RESCORE_CHECKPOINT_PATH = os.getenv(
+    "PLAYWELL_RESCORE_CHECKPOINT",
+    os.path.join(os.path.dirname(__file__), "instance", "rescore_checkpoint.json")
+)
@@ -1,20 +1,200 @@
+import itertools
 import os
+import threading
+import time
+
 from flask_sqlalchemy import SQLAlchemy
-from flask import Flask
+from flask_sqlalchemy.session import Session
+from flask import Flask, g, has_app_context
+import sqlalchemy as sa
+from sqlalchemy import text
+from backend.config import (
+    DATABASE_POOL_SIZE, DATABASE_MAX_OVERFLOW, DATABASE_POOL_TIMEOUT, DATABASE_PRE_PING,
+    DATABASE_REPLICA_URLS, REPLICA_HEALTH_INTERVAL, DATABASE_SHARD_URLS,
+)
+
+REPLICA_BIND_PREFIX = "replica_"
+SHARD_BIND_PREFIX = "shard_"
+
+# Tables that live on the user's shard when DATABASE_SHARD_URLS is set
+# (shard_move_log is bookkeeping for backend/sharding.py moves)
+SHARDED_TABLES = {"game_session", "analysis_result", "session_trials", "shard_move_log"}
+
+
+def shard_bind_key(index):
+    return f"{SHARD_BIND_PREFIX}{index}"
+
+
+class ReplicaRouter:
+    """Round-robin over healthy replicas, per process.
+
+    A daemon thread pings each replica every REPLICA_HEALTH_INTERVAL seconds;
+    replicas failing the ping are skipped until they answer again. When no
+    replica is healthy, reads fall back to the primary.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cycle = None
+        self._engines = {}
+        self._healthy = {}
+        self._pid = None
+
+    def _start(self, engines):
+        self._engines = {
+            key: engine for key, engine in engines.items()
+            if key and key.startswith(REPLICA_BIND_PREFIX)
+        }
+        self._healthy = {key: True for key in self._engines}
+        self._cycle = itertools.cycle(sorted(self._engines))
+        self._pid = os.getpid()
+
+        if self._engines:
+            threading.Thread(target=self._health_loop, daemon=True).start()
+
+    def _health_loop(self):
+        while True:
+            time.sleep(REPLICA_HEALTH_INTERVAL)
+            self.check_health()
+
+    def check_health(self):
+        for key, engine in self._engines.items():
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                ok = True
+            except Exception as e:
+                print(f"replica {key} health check failed:", e)
+                ok = False
+            self._healthy[key] = ok
+
+    def choose(self, engines):
+        with self._lock:
+            # Engines and the health thread must not cross a fork
+            if self._pid != os.getpid():
+                self._start(engines)
+
+            for _ in range(len(self._engines)):
+                key = next(self._cycle)
+                if self._healthy.get(key):
+                    return self._engines[key]
+        return None
+
+
+replica_router = ReplicaRouter()
+
+
+def _table_name(mapper, clause):
+    if mapper is not None:
+        try:
+            return sa.inspect(mapper).local_table.name
+        except Exception:
+            return None
+    table = getattr(clause, "table", None)
+    return getattr(table, "name", None)
+
+
+class RoutingSession(Session):
+    """Routes statements to the right engine:
+
+    - sharded tables go to the shard selected for the request in
+      `g.shard_key` (set by token_required, see backend/sharding.py);
+    - reads go to the replica pinned in `g.replica` for the request (see
+      backend/utils/read_routing.py). Writes, flushes and anything bound to
+      a non-default engine always use the normal bind.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and DATABASE_SHARD_URLS and _table_name(mapper, clause) in SHARDED_TABLES:
+            key = g.get("shard_key") if has_app_context() else None
+            if key is None:
+                raise RuntimeError("sharded table used without selecting a shard")
+            return self._db.engines[key]
+
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+        if (
+            bind is None
+            and has_app_context()
+            and g.get("replica") is not None
+            and not self._flushing
+            and not (self.new or self.dirty or self.deleted)
+            and not getattr(clause, "is_dml", False)
+            and engine is self._db.engines.get(None)
+        ):
+            return g.replica
+
+        return engine
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+def upsert(model):
+    """INSERT for `model` with .on_conflict_do_update/_nothing, for the
+    engine the current session uses for it (Postgres or SQLite)."""
+    dialect = db.session.get_bind(mapper=sa.inspect(model)).dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+
+def normalize_url(url):
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    return url
+
+
+def engine_options(url, *prefixes):
+    """Pool settings for one engine. Each setting is read from the first of
+    `{prefix}_POOL_SIZE`, ... that is set, else the primary's defaults."""
+    def setting(name, default, cast):
+        for prefix in prefixes:
+            value = os.getenv(f"{prefix}_{name}")
+            if value is not None:
+                return cast(value)
+        return default
+
+    options = {
+        "pool_pre_ping": setting("PRE_PING", DATABASE_PRE_PING, lambda v: v != "0"),
+    }
+    if not url.startswith("sqlite"):
+        options.update({
+            "pool_size": setting("POOL_SIZE", DATABASE_POOL_SIZE, int),
+            "max_overflow": setting("MAX_OVERFLOW", DATABASE_MAX_OVERFLOW, int),
+            "pool_timeout": setting("POOL_TIMEOUT", DATABASE_POOL_TIMEOUT, float),
+        })
+    return options
 
-db = SQLAlchemy()
 
 def init_db(app: Flask):
     database_url = os.getenv("DATABASE_URL")
 
     if database_url:
-        if database_url.startswith("postgres://"):
-            database_url = database_url.replace("postgres://", "postgresql://", 1)
+        database_url = normalize_url(database_url)
     else:
         # Fallback local
         database_url = "sqlite:///playwell.db"
 
     app.config["SQLALCHEMY_DATABASE_URI"] = database_url
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(database_url)
+
+    binds = {}
+    for i, url in enumerate(DATABASE_REPLICA_URLS):
+        url = normalize_url(url)
+        binds[f"{REPLICA_BIND_PREFIX}{i}"] = {
+            "url": url,
+            **engine_options(url, f"DATABASE_REPLICA_{i}", "DATABASE_REPLICA"),
+        }
+    for i, url in enumerate(DATABASE_SHARD_URLS):
+        url = normalize_url(url)
+        binds[shard_bind_key(i)] = {
+            "url": url,
+            **engine_options(url, f"DATABASE_SHARD_{i}", "DATABASE_SHARD"),
+        }
+    app.config["SQLALCHEMY_BINDS"] = binds
 
     db.init_app(app)
@@ -1,7 +1,10 @@
 from backend.app import create_app
 from backend.database import db
+from backend.sharding import sharding_enabled, create_shard_tables
 
 app = create_app()
 
 with app.app_context():
     db.create_all()
+    if sharding_enabled():
+        create_shard_tables()
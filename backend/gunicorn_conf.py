@@ -0,0 +1,51 @@
+# backend/gunicorn_conf.py
+#
+# High-concurrency serving mode:
+#
+#   gunicorn -c backend/gunicorn_conf.py wsgi:app
+#
+# PLAYWELL_WORKER_CLASS=gthread (default): each worker serves many requests
+#   on OS threads; DB waits and password hashing release the GIL.
+# PLAYWELL_WORKER_CLASS=gevent: each worker serves thousands of greenlets;
+#   psycopg2 is made cooperative via psycogreen when installed, and model
+#   inference / hashing run in the hub threadpool (backend/utils/offload.py).
+#
+# The app is preloaded in the master so the models are loaded once and
+# shared copy-on-write by all workers instead of one copy per worker.
+
+import gc
+import os
+
+worker_class = os.getenv("PLAYWELL_WORKER_CLASS", "gthread")
+
+if worker_class == "gevent":
+    # Must happen before the app (and its DB driver) is imported
+    from gevent import monkey
+    monkey.patch_all()
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        pass
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("PLAYWELL_THREADS", "16"))
+worker_connections = int(os.getenv("PLAYWELL_WORKER_CONNECTIONS", "1000"))
+preload_app = True
+timeout = int(os.getenv("PLAYWELL_WORKER_TIMEOUT", "30"))
+keepalive = 5
+
+# One pooled DB connection per concurrent request slot in a worker
+if worker_class == "gevent":
+    os.environ.setdefault("DATABASE_POOL_SIZE", "20")
+    os.environ.setdefault("DATABASE_MAX_OVERFLOW", "30")
+else:
+    os.environ.setdefault("DATABASE_POOL_SIZE", str(threads))
+    os.environ.setdefault("DATABASE_MAX_OVERFLOW", "4")
+
+
+def pre_fork(server, worker):
+    # Move preloaded objects (models, modules) out of the GC's tracked
+    # generations so collections in workers don't touch, and copy, their pages
+    gc.freeze()
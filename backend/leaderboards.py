@@ -0,0 +1,273 @@
+# backend/leaderboards.py
+#
+# Per-game leaderboards over day / week / all-time windows.
+#
+# leaderboard_entry keeps each user's best value per board and period, so
+# the table grows with players, not sessions. Submits upsert those rows and
+# patch this process's top-k cache in place; other workers pick the change
+# up when their cached copy expires (LEADERBOARD_CACHE_TTL). Reads of the
+# top list are served from the cache, and a user's own rank is one indexed
+# COUNT over the board.
+#
+#   python -m backend.leaderboards rebuild   # recompute from game_session
+#   python -m backend.leaderboards expire    # drop stale day/week periods
+
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, text
+
+from backend.config import LEADERBOARD_SIZE, LEADERBOARD_CACHE_TTL, LEADERBOARD_KEEP_DAYS
+from backend.database import db, upsert
+from backend.models.leaderboard_model import LeaderboardEntry
+from backend.models.user_model import User
+from backend.sharding import fan_out
+
+# metric -> True when lower values rank higher
+METRICS = {
+    "reaction_time_avg": True,
+    "memory_score": False,
+    "cognitive_score": False,
+}
+
+WINDOWS = ("day", "week", "all")
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def period_for(window, when=None):
+    when = when or datetime.utcnow()
+    if window == "day":
+        return f"day:{when:%Y-%m-%d}"
+    if window == "week":
+        year, week, _ = when.isocalendar()
+        return f"week:{year}-W{week:02d}"
+    return "all"
+
+
+def _better(metric, a, b):
+    return a < b if METRICS[metric] else a > b
+
+
+def _order(metric):
+    col = LeaderboardEntry.value
+    return col.asc() if METRICS[metric] else col.desc()
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+def _load_top(game_type, metric, period):
+    rows = (
+        db.session.query(LeaderboardEntry.user_id, User.name, LeaderboardEntry.value)
+        .join(User, User.id == LeaderboardEntry.user_id)
+        .filter(
+            LeaderboardEntry.game_type == game_type,
+            LeaderboardEntry.metric == metric,
+            LeaderboardEntry.period == period
+        )
+        .order_by(_order(metric), LeaderboardEntry.updated_at.asc())
+        .limit(LEADERBOARD_SIZE)
+        .all()
+    )
+    return [{"user_id": uid, "name": name, "value": value} for uid, name, value in rows]
+
+
+def top(game_type, metric, window, limit=10):
+    period = period_for(window)
+    key = (game_type, metric, period)
+    now = time.monotonic()
+
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and now - entry["loaded"] < LEADERBOARD_CACHE_TTL:
+            return entry["rows"][:limit]
+
+    rows = _load_top(game_type, metric, period)
+    with _cache_lock:
+        # Drop boards of periods that have rolled over
+        for stale in [k for k in _cache if k[2] != period_for(k[2].split(":")[0])]:
+            del _cache[stale]
+        _cache[key] = {"loaded": now, "rows": rows}
+    return rows[:limit]
+
+
+def _patch_cache(game_type, metric, period, user, value):
+    with _cache_lock:
+        entry = _cache.get((game_type, metric, period))
+        if entry is None:
+            return
+        rows = [r for r in entry["rows"] if r["user_id"] != user.id]
+        rows.append({"user_id": user.id, "name": user.name, "value": value})
+        rows.sort(key=lambda r: r["value"], reverse=not METRICS[metric])
+        entry["rows"] = rows[:LEADERBOARD_SIZE]
+
+
+# ---------------------------------------------------------------------------
+# Submit path
+# ---------------------------------------------------------------------------
+
+def record_values(user, game_type, session_id, values, when=None):
+    """values: {metric: value or None}. Runs inside the caller's transaction;
+    cache patches are returned as callables to apply after commit."""
+    when = when or datetime.utcnow()
+    patches = []
+
+    for metric, value in values.items():
+        if value is None or metric not in METRICS:
+            continue
+        value = float(value)
+
+        for window in WINDOWS:
+            period = period_for(window, when)
+            # Insert, or replace only if better, in one statement so
+            # concurrent first submits for a board can't both insert
+            stmt = upsert(LeaderboardEntry).values(
+                game_type=game_type, metric=metric, period=period,
+                user_id=user.id, session_id=session_id, value=value,
+                updated_at=when
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["game_type", "metric", "period", "user_id"],
+                set_={
+                    "value": stmt.excluded.value,
+                    "session_id": stmt.excluded.session_id,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+                where=_better(metric, stmt.excluded.value, LeaderboardEntry.value)
+            )
+            if db.session.execute(stmt).rowcount:
+                patches.append((game_type, metric, period, value))
+
+    def apply():
+        for game_type_, metric, period, value in patches:
+            _patch_cache(game_type_, metric, period, user, value)
+
+    return apply
+
+
+def user_rank(user_id, game_type, metric, window):
+    period = period_for(window)
+    mine = LeaderboardEntry.query.filter_by(
+        game_type=game_type, metric=metric, period=period, user_id=user_id
+    ).first()
+    if mine is None:
+        return None
+
+    beats = (
+        LeaderboardEntry.value < mine.value if METRICS[metric]
+        else LeaderboardEntry.value > mine.value
+    )
+    ahead = (
+        db.session.query(func.count(LeaderboardEntry.id))
+        .filter(
+            LeaderboardEntry.game_type == game_type,
+            LeaderboardEntry.metric == metric,
+            LeaderboardEntry.period == period,
+            beats
+        )
+        .scalar()
+    )
+    return {"rank": ahead + 1, "value": mine.value}
+
+
+# ---------------------------------------------------------------------------
+# Maintenance
+# ---------------------------------------------------------------------------
+
+def expire(keep_days=LEADERBOARD_KEEP_DAYS):
+    now = datetime.utcnow()
+    keep = {period_for("day", now - timedelta(days=d)) for d in range(keep_days)}
+    keep |= {period_for("week", now - timedelta(weeks=w)) for w in range(keep_days // 7 + 1)}
+    keep.add("all")
+
+    deleted = (
+        LeaderboardEntry.query
+        .filter(LeaderboardEntry.period.notin_(keep))
+        .delete(synchronize_session=False)
+    )
+    db.session.commit()
+    print(f"expired {deleted} leaderboard entries")
+
+
+REBUILD_QUERY = """
+    SELECT s.game_type, s.user_id, {agg}({column}) AS best
+    FROM game_session s
+    LEFT JOIN analysis_result a ON a.session_id = s.id
+    WHERE {column} IS NOT NULL {where}
+    GROUP BY s.game_type, s.user_id
+"""
+
+METRIC_COLUMNS = {
+    "reaction_time_avg": "s.reaction_time_avg",
+    "memory_score": "s.memory_score",
+    "cognitive_score": "a.cognitive_score",
+}
+
+
+def _query_rows(engine, sql, params):
+    with engine.connect() as conn:
+        return conn.execute(text(sql), params).all()
+
+
+def rebuild():
+    now = datetime.utcnow()
+    day_start = datetime(now.year, now.month, now.day)
+    week_start = day_start - timedelta(days=now.weekday())
+    starts = {"day": day_start, "week": week_start, "all": None}
+
+    LeaderboardEntry.query.delete(synchronize_session=False)
+
+    total = 0
+    for metric, lower_is_better in METRICS.items():
+        for window in WINDOWS:
+            sql = REBUILD_QUERY.format(
+                agg="MIN" if lower_is_better else "MAX",
+                column=METRIC_COLUMNS[metric],
+                where="AND s.created_at >= :start" if starts[window] else ""
+            )
+            # Each user's sessions live on a single shard, so per-shard
+            # bests are already per-user bests
+            rows = [
+                row for shard_rows in fan_out(_query_rows, sql, {"start": starts[window]})
+                for row in shard_rows
+            ]
+            db.session.add_all([
+                LeaderboardEntry(
+                    game_type=game_type, metric=metric, period=period_for(window, now),
+                    user_id=user_id, value=float(best), updated_at=now
+                )
+                for game_type, user_id, best in rows
+            ])
+            total += len(rows)
+
+    db.session.commit()
+    with _cache_lock:
+        _cache.clear()
+    print(f"rebuilt {total} leaderboard entries")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PlayWell leaderboards")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="recompute all current boards from game_session")
+    p = sub.add_parser("expire", help="delete day/week periods past retention")
+    p.add_argument("--keep-days", type=int, default=LEADERBOARD_KEEP_DAYS)
+    args = parser.parse_args(argv)
+
+    from backend.app import create_app
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if args.command == "rebuild":
+            rebuild()
+        else:
+            expire(args.keep_days)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+# backend/loadtest.py
+#
+# End-to-end load generator for the PlayWell API.
+#
+#   python -m backend.loadtest --scenario mixed
+#   python -m backend.loadtest --url http://127.0.0.1:8000 --concurrency 64 --duration 60
+#   python -m backend.loadtest --scenario heavy --out report.json
+#
+# Without --url an in-process threaded server is started from
+# backend.app:create_app (against DATABASE_URL, default local SQLite).
+# Synthetic users are registered and logged in through /api/auth/*, then
+# a weighted mix of submit / predict / history / stats is replayed at the
+# requested concurrency. The report (JSON) has throughput, p50/p95/p99
+# latency and error rates per endpoint; endpoints hit by "heavy" users
+# (seeded with many sessions) are reported separately as e.g. "history[heavy]".
+
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+import numpy as np
+
+SCENARIOS = {
+    "smoke": {
+        "users": 5, "heavy_users": 0, "heavy_sessions": 0,
+        "concurrency": 4, "duration": 10,
+        "mix": {"submit": 2, "predict": 2, "history": 3, "stats": 3},
+    },
+    "mixed": {
+        "users": 50, "heavy_users": 0, "heavy_sessions": 0,
+        "concurrency": 32, "duration": 30,
+        "mix": {"submit": 3, "predict": 2, "history": 3, "stats": 2},
+    },
+    "dashboard": {
+        "users": 50, "heavy_users": 5, "heavy_sessions": 2000,
+        "concurrency": 32, "duration": 30,
+        "mix": {"submit": 1, "predict": 0, "history": 5, "stats": 4},
+    },
+    "heavy": {
+        "users": 20, "heavy_users": 5, "heavy_sessions": 10000,
+        "concurrency": 32, "duration": 60,
+        "mix": {"submit": 3, "predict": 1, "history": 3, "stats": 3},
+    },
+}
+
+GAMES = {
+    "Reaction Test": lambda: {"reaction_avg": random.gauss(320, 60)},
+    "Visual Search": lambda: {"reaction_avg": random.gauss(650, 120)},
+    "Memory Test": lambda: {"memory_score": random.uniform(30, 100)},
+    "Pattern Memory": lambda: {"memory_score": random.uniform(30, 100)},
+    "Dual Task": lambda: {
+        "reaction_avg": random.gauss(500, 100),
+        "memory_score": random.uniform(30, 100),
+    },
+    "Stroop Test": lambda: {
+        "reaction_avg": random.gauss(700, 150),
+        "memory_score": random.uniform(30, 100),
+    },
+}
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+
+class Client:
+    """One keep-alive connection per worker thread."""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.https = parts.scheme == "https"
+        self.timeout = timeout
+        self.conn = None
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self.conn = cls(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        for attempt in range(2):
+            if self.conn is None:
+                self._connect()
+            try:
+                self.conn.request(method, path, body=payload, headers=headers)
+                resp = self.conn.getresponse()
+                data = resp.read()
+                return resp.status, resp.headers, data
+            except (http.client.HTTPException, ConnectionError, OSError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+
+def start_in_process_server(keep_limits=False):
+    if not keep_limits:
+        os.environ["PLAYWELL_ADMISSION"] = "0"
+
+    from werkzeug.serving import make_server
+    from backend.app import create_app
+    from backend.database import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+# ---------------------------------------------------------------------------
+# Setup
+# ---------------------------------------------------------------------------
+
+def create_users(base_url, count, run_id):
+    client = Client(base_url)
+    users = []
+    for i in range(count):
+        email = f"lt-{run_id}-{i}@loadtest.local"
+        status, _, body = client.request("POST", "/api/auth/register", {
+            "name": f"Load {i}",
+            "email": email,
+            "password": "loadtest",
+            "age": random.randint(16, 70),
+            "gender": random.choice(["male", "female"]),
+        })
+        if status not in (200, 201):
+            raise RuntimeError(f"register failed ({status}): {body[:200]!r}")
+
+        status, _, body = client.request("POST", "/api/auth/login", {
+            "email": email, "password": "loadtest"
+        })
+        if status != 200:
+            raise RuntimeError(f"login failed ({status}): {body[:200]!r}")
+
+        data = json.loads(body)
+        users.append({"id": data["user"]["id"], "token": data["token"], "heavy": False})
+    return users
+
+
+def seed_heavy_users(users, sessions_per_user, chunk=2000):
+    """Bulk-inserts historical sessions for heavy users straight into
+    DATABASE_URL (the target must share that database)."""
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert
+    from backend.app import create_app
+    from backend.database import db
+    from backend.models.game_model import GameSession, AnalysisResult
+    from backend.sharding import use_user_shard
+    from backend.utils.response_cache import bump_user_version
+
+    app = create_app()
+    now = datetime.utcnow()
+    with app.app_context():
+        for user in users:
+            use_user_shard(user["id"])
+            for start in range(0, sessions_per_user, chunk):
+                rows = []
+                for i in range(start, min(start + chunk, sessions_per_user)):
+                    game_type = random.choice(list(GAMES))
+                    values = GAMES[game_type]()
+                    rows.append({
+                        "user_id": user["id"],
+                        "game_type": game_type,
+                        "reaction_time_avg": values.get("reaction_avg"),
+                        "memory_score": values.get("memory_score"),
+                        "errors": random.randint(0, 3),
+                        "duration": random.uniform(10, 60),
+                        "created_at": now - timedelta(minutes=sessions_per_user - i),
+                    })
+
+                ids = db.session.scalars(
+                    insert(GameSession).returning(GameSession.id), rows
+                ).all()
+                db.session.execute(insert(AnalysisResult), [{
+                    "session_id": sid,
+                    "stress_level": random.choice(["low", "medium", "high"]),
+                    "cognitive_score": random.uniform(20, 95),
+                    "recommendations": json.dumps("seeded"),
+                } for sid in ids])
+
+            bump_user_version(user["id"])
+            db.session.commit()
+            user["heavy"] = True
+
+
+# ---------------------------------------------------------------------------
+# Load
+# ---------------------------------------------------------------------------
+
+def make_request(kind, user, etags):
+    auth = {"Authorization": f"Bearer {user['token']}"}
+
+    if kind == "submit":
+        game_type = random.choice(list(GAMES))
+        body = {"gameType": game_type, "durationMs": random.randint(5000, 60000),
+                "meta": {"errors": random.randint(0, 3)}}
+        body.update(GAMES[game_type]())
+        return "POST", "/api/game/submit", body, auth
+
+    if kind == "predict":
+        return "POST", "/api/game/predict", {
+            "reaction_avg": random.gauss(350, 80),
+            "memory_score": random.uniform(30, 100),
+        }, {}
+
+    path = f"/api/user/{kind}/{user['id']}"
+    headers = dict(auth)
+    if etags is not None and (kind, user["id"]) in etags:
+        headers["If-None-Match"] = etags[(kind, user["id"])]
+    return "GET", path, None, headers
+
+
+def worker(base_url, users, kinds, weights, deadline, records, conditional):
+    client = Client(base_url)
+    etags = {} if conditional else None
+    local = []
+
+    while time.monotonic() < deadline:
+        kind = random.choices(kinds, weights)[0]
+        user = random.choice(users)
+        method, path, body, headers = make_request(kind, user, etags)
+        name = f"{kind}[heavy]" if user["heavy"] and kind != "predict" else kind
+
+        t0 = time.perf_counter()
+        try:
+            status, resp_headers, _ = client.request(method, path, body, headers)
+        except Exception:
+            status, resp_headers = 0, {}
+        elapsed = time.perf_counter() - t0
+
+        if etags is not None and status == 200 and resp_headers.get("ETag"):
+            etags[(kind, user["id"])] = resp_headers["ETag"]
+        local.append((name, status, elapsed))
+
+    records.extend(local)
+
+
+def summarize(records, wall_time):
+    by_name = {}
+    for name, status, elapsed in records:
+        by_name.setdefault(name, []).append((status, elapsed))
+
+    def stats(rows):
+        statuses = np.array([r[0] for r in rows])
+        lat = np.array([r[1] for r in rows]) * 1000.0
+        errors = int(np.sum((statuses == 0) | (statuses >= 400)))
+        codes = {}
+        for s in statuses.tolist():
+            codes[str(s)] = codes.get(str(s), 0) + 1
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99]) if len(lat) else (0, 0, 0)
+        return {
+            "requests": len(rows),
+            "throughput_rps": round(len(rows) / wall_time, 2),
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+            "shed": int(np.sum((statuses == 429) | (statuses == 503))),
+            "status_codes": codes,
+            "latency_ms": {
+                "p50": round(float(p50), 2),
+                "p95": round(float(p95), 2),
+                "p99": round(float(p99), 2),
+                "max": round(float(lat.max()), 2) if len(lat) else 0.0,
+            },
+        }
+
+    return {
+        "overall": stats([(s, e) for _, s, e in records]),
+        "endpoints": {name: stats(rows) for name, rows in sorted(by_name.items())},
+    }
+
+
+def run(args):
+    scenario = dict(SCENARIOS[args.scenario])
+    for key in ("users", "heavy_users", "heavy_sessions", "concurrency", "duration"):
+        if getattr(args, key) is not None:
+            scenario[key] = getattr(args, key)
+    if args.mix:
+        scenario["mix"] = {
+            k: float(v) for k, v in (item.split("=") for item in args.mix.split(","))
+        }
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        server, base_url = start_in_process_server(keep_limits=args.keep_limits)
+
+    run_id = uuid.uuid4().hex[:8]
+    print(f"[loadtest] target={base_url} scenario={args.scenario} run={run_id}", file=sys.stderr)
+
+    users = create_users(base_url, scenario["users"], run_id)
+    if scenario["heavy_users"] and scenario["heavy_sessions"]:
+        print(f"[loadtest] seeding {scenario['heavy_users']} heavy users x "
+              f"{scenario['heavy_sessions']} sessions", file=sys.stderr)
+        seed_heavy_users(users[:scenario["heavy_users"]], scenario["heavy_sessions"])
+
+    kinds = [k for k, w in scenario["mix"].items() if w > 0]
+    weights = [scenario["mix"][k] for k in kinds]
+
+    records = []
+    start = time.monotonic()
+    deadline = start + scenario["duration"]
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(base_url, users, kinds, weights, deadline, records, args.conditional)
+        )
+        for _ in range(scenario["concurrency"])
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall_time = time.monotonic() - start
+
+    report = {
+        "target": base_url,
+        "scenario": args.scenario,
+        "config": scenario,
+        "conditional_get": args.conditional,
+        "wall_time_s": round(wall_time, 2),
+    }
+    report.update(summarize(records, wall_time))
+
+    if server is not None:
+        server.shutdown()
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="PlayWell API load generator")
+    parser.add_argument("--url", help="target base URL (default: in-process server)")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--heavy-users", type=int)
+    parser.add_argument("--heavy-sessions", type=int)
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--duration", type=float, help="seconds")
+    parser.add_argument("--mix", help="e.g. submit=3,predict=1,history=3,stats=3")
+    parser.add_argument("--conditional", action="store_true",
+                        help="replay ETags with If-None-Match like a browser")
+    parser.add_argument("--keep-limits", action="store_true",
+                        help="keep admission control on for the in-process server")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+# backend/ml/drift.py
+#
+# Streaming drift monitoring for model inputs and outputs.
+#
+# train_models.py exports a reference profile (reference_profile.json):
+# quantile bin edges and expected bin shares for the numeric features, and
+# category shares for the categorical ones. At serving time every scored
+# request adds one count per feature to fixed-size per-window histograms
+# (a bisect per feature, constant memory). A background thread in each
+# worker flushes those counts into the shared SQLite store and recomputes
+# PSI and (binned) KS per window, so the request path never does more than
+# the increments. /health/drift serves the stored scores.
+
+import bisect
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from backend.config import (
+    DRIFT_ENABLED, DRIFT_WINDOW_SECONDS, DRIFT_FLUSH_INTERVAL,
+    DRIFT_KEEP_WINDOWS, DRIFT_PSI_ALERT,
+)
+from backend.utils.shared_store import transaction, get_connection
+
+REFERENCE_PATH = os.path.join(os.path.dirname(__file__), "reference_profile.json")
+
+# feature name -> column of the training frame (None: model output)
+NUMERIC_FEATURES = {
+    "reaction_time": "Reaction_Time",
+    "memory_score": "Memory_Test_Score",
+    "age": "Age",
+    "cognitive_score": None,
+}
+CATEGORICAL_FEATURES = {
+    "gender": "Gender",
+    "stress_level": None,
+}
+
+OTHER = "__other__"
+EPS = 1e-4
+
+
+# ---------------------------------------------------------------------------
+# Reference profile (training time)
+# ---------------------------------------------------------------------------
+
+def _numeric_profile(values, n_bins):
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    inner = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+    counts = np.bincount(np.searchsorted(inner, values, side="right"), minlength=len(inner) + 1)
+    return {"edges": inner.tolist(), "expected": (counts / counts.sum()).tolist()}
+
+
+def _categorical_profile(values):
+    values = [str(v).strip().lower() for v in values]
+    cats, counts = np.unique(values, return_counts=True)
+    return {
+        "categories": cats.tolist() + [OTHER],
+        "expected": (counts / counts.sum()).tolist() + [0.0],
+    }
+
+
+def build_reference_profile(X, stress_labels, cognitive_scores, n_bins=20):
+    """X: training frame with the model's raw input columns; stress_labels:
+    predicted class names; cognitive_scores: predictions on the 0-100 scale."""
+    numeric = {
+        name: _numeric_profile(X[col] if col else cognitive_scores, n_bins)
+        for name, col in NUMERIC_FEATURES.items()
+    }
+    categorical = {
+        name: _categorical_profile(X[col] if col else stress_labels)
+        for name, col in CATEGORICAL_FEATURES.items()
+    }
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "n": int(len(X)),
+        "numeric": numeric,
+        "categorical": categorical,
+    }
+
+
+def save_reference_profile(profile, path=REFERENCE_PATH):
+    with open(path, "w") as f:
+        json.dump(profile, f, indent=2)
+
+
+def load_reference_profile(path=REFERENCE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+# ---------------------------------------------------------------------------
+# Scores
+# ---------------------------------------------------------------------------
+
+def psi(expected, counts):
+    p = np.clip(np.asarray(expected, dtype=float), EPS, None)
+    q = np.clip(np.asarray(counts, dtype=float) / max(1, np.sum(counts)), EPS, None)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def binned_ks(expected, counts):
+    # Max CDF gap evaluated at the bin edges
+    q = np.asarray(counts, dtype=float) / max(1, np.sum(counts))
+    return float(np.max(np.abs(np.cumsum(expected) - np.cumsum(q))))
+
+
+def score_window(profile, counts):
+    """counts: {feature: array of bin counts}."""
+    features = {}
+    for name, ref in profile["numeric"].items():
+        c = counts.get(name)
+        if c is None or not np.sum(c):
+            continue
+        features[name] = {
+            "n": int(np.sum(c)),
+            "psi": round(psi(ref["expected"], c), 4),
+            "ks": round(binned_ks(ref["expected"], c), 4),
+        }
+    for name, ref in profile["categorical"].items():
+        c = counts.get(name)
+        if c is None or not np.sum(c):
+            continue
+        q = np.asarray(c, dtype=float) / np.sum(c)
+        features[name] = {
+            "n": int(np.sum(c)),
+            "psi": round(psi(ref["expected"], c), 4),
+            "shares": dict(zip(ref["categories"], np.round(q, 4).tolist())),
+        }
+
+    alerts = sorted(n for n, f in features.items() if f["psi"] >= DRIFT_PSI_ALERT)
+    return {"features": features, "alerts": alerts}
+
+
+# ---------------------------------------------------------------------------
+# Streaming monitor (serving time)
+# ---------------------------------------------------------------------------
+
+class DriftMonitor:
+    def __init__(self, profile):
+        self.profile = profile
+        self._lock = threading.Lock()
+        self._windows = {}
+        self._pid = None
+        self._cat_index = {
+            name: {c: i for i, c in enumerate(ref["categories"])}
+            for name, ref in profile["categorical"].items()
+        }
+
+    def _new_counts(self):
+        counts = {
+            name: [0] * (len(ref["edges"]) + 1)
+            for name, ref in self.profile["numeric"].items()
+        }
+        counts.update({
+            name: [0] * len(ref["categories"])
+            for name, ref in self.profile["categorical"].items()
+        })
+        return counts
+
+    def _ensure_thread(self):
+        # Called under the lock; the flusher must be (re)started per process
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._windows = {}
+            threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def observe(self, reaction, memory, age, gender, stress_level, cognitive):
+        values = {
+            "reaction_time": reaction, "memory_score": memory,
+            "age": age, "cognitive_score": cognitive,
+        }
+        categories = {
+            "gender": str(gender).strip().lower(),
+            "stress_level": str(stress_level).strip().lower(),
+        }
+        window = int(time.time()) // DRIFT_WINDOW_SECONDS * DRIFT_WINDOW_SECONDS
+
+        with self._lock:
+            self._ensure_thread()
+            counts = self._windows.get(window)
+            if counts is None:
+                counts = self._windows[window] = self._new_counts()
+
+            for name, value in values.items():
+                if value is None:
+                    continue
+                edges = self.profile["numeric"][name]["edges"]
+                counts[name][bisect.bisect_right(edges, float(value))] += 1
+
+            for name, value in categories.items():
+                index = self._cat_index[name]
+                counts[name][index.get(value, index[OTHER])] += 1
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(DRIFT_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:
+                print("drift flush error:", e)
+
+    def flush(self):
+        with self._lock:
+            windows, self._windows = self._windows, {}
+
+        rows = [
+            (window, name, b, c)
+            for window, counts in windows.items()
+            for name, bins in counts.items()
+            for b, c in enumerate(bins) if c
+        ]
+        oldest = (int(time.time()) // DRIFT_WINDOW_SECONDS - DRIFT_KEEP_WINDOWS) * DRIFT_WINDOW_SECONDS
+
+        with transaction() as conn:
+            conn.executemany(
+                "INSERT INTO drift_counts (window_start, feature, bin, count) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (window_start, feature, bin) "
+                "DO UPDATE SET count = count + excluded.count",
+                rows
+            )
+            conn.execute("DELETE FROM drift_counts WHERE window_start < ?", (oldest,))
+            conn.execute("DELETE FROM drift_scores WHERE window_start < ?", (oldest,))
+
+        for window in windows:
+            self.compute(window)
+
+    def compute(self, window):
+        counts = self._new_counts()
+        for name, b, c in get_connection().execute(
+            "SELECT feature, bin, count FROM drift_counts WHERE window_start = ?",
+            (window,)
+        ):
+            if name in counts and b < len(counts[name]):
+                counts[name][b] = c
+
+        payload = score_window(self.profile, counts)
+        payload["window_start"] = window
+        payload["window_seconds"] = DRIFT_WINDOW_SECONDS
+
+        with transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO drift_scores (window_start, computed_at, payload) "
+                "VALUES (?, ?, ?)",
+                (window, time.time(), json.dumps(payload))
+            )
+
+
+def recent_scores(limit=24):
+    rows = get_connection().execute(
+        "SELECT payload FROM drift_scores ORDER BY window_start DESC LIMIT ?",
+        (limit,)
+    ).fetchall()
+    return [json.loads(r[0]) for r in rows]
+
+
+_profile = load_reference_profile() if DRIFT_ENABLED else None
+monitor = DriftMonitor(_profile) if _profile else None
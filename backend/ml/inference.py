@@ -0,0 +1,118 @@
+# backend/ml/inference.py
+#
+# Loads the trained models once per process (before fork when gunicorn
+# preloads the app, so workers share the pages copy-on-write) and exposes
+# thread-safe scoring helpers.
+
+import os
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from backend.utils.offload import offload
+from backend.ml.drift import monitor as drift_monitor
+
+ML_DIR = os.path.dirname(__file__)
+MODEL_STRESS_PATH = os.path.join(ML_DIR, "model_stress.pkl")
+MODEL_COG_PATH = os.path.join(ML_DIR, "model_cognitive.pkl")
+
+_model_stress = joblib.load(MODEL_STRESS_PATH) if os.path.exists(MODEL_STRESS_PATH) else None
+_model_cog = joblib.load(MODEL_COG_PATH) if os.path.exists(MODEL_COG_PATH) else None
+
+STRESS_MAP = {
+    0: "low",
+    1: "medium",
+    2: "high"
+}
+
+def normalize_gender(gender):
+    g = str(gender).strip().lower()
+    return "Female" if g in ("female", "f", "woman") else "Male"
+
+
+def build_model_input(reaction, memory, age, gender):
+    return pd.DataFrame([{
+        "Reaction_Time": float(reaction),
+        "Memory_Test_Score": float(memory),
+        "Age": float(age),
+        "Gender": normalize_gender(gender),
+    }])
+
+
+# Recent predictions, keyed by coarsened inputs. Served instead of running
+# the models when /game/predict is saturated (degraded mode).
+PREDICTION_CACHE_SIZE = 2048
+_prediction_cache = OrderedDict()
+_prediction_cache_lock = threading.Lock()
+
+
+def _prediction_key(reaction, memory, age, gender):
+    return (
+        int(round(float(reaction) / 10.0)),
+        int(round(float(memory))),
+        int(float(age)) // 5,
+        normalize_gender(gender),
+    )
+
+
+def _run_models(X):
+    # Read-only on the fitted pipelines; XGBoost predict is thread-safe
+    stress_idx = int(_model_stress.predict(X)[0]) if _model_stress else 1
+    cog_raw = float(_model_cog.predict(X)[0]) if _model_cog else 0.5
+    return stress_idx, cog_raw
+
+
+def predict_scores(reaction, memory, age, gender):
+    X = build_model_input(reaction, memory, age, gender)
+
+    # Inference is CPU-bound: keep it off the gevent hub / bounded under gthread
+    stress_idx, cog_raw = offload(_run_models, X)
+
+    stress_pred = STRESS_MAP.get(stress_idx, "medium")
+    cognitive = int(max(0, min(100, round(cog_raw * 100))))
+
+    key = _prediction_key(reaction, memory, age, gender)
+    with _prediction_cache_lock:
+        _prediction_cache[key] = (stress_pred, cognitive)
+        _prediction_cache.move_to_end(key)
+        if len(_prediction_cache) > PREDICTION_CACHE_SIZE:
+            _prediction_cache.popitem(last=False)
+
+    if drift_monitor is not None:
+        try:
+            drift_monitor.observe(
+                reaction, memory, age, normalize_gender(gender), stress_pred, cognitive
+            )
+        except Exception as e:
+            print("drift observe error:", e)
+
+    return stress_pred, cognitive
+
+
+def predict_batch(reaction, memory, age, gender):
+    """Vectorized scoring for offline jobs (see backend/rescore.py).
+    Returns (stress labels, cognitive scores) as lists. Skips the
+    prediction cache and drift monitor, which describe live traffic."""
+    X = pd.DataFrame({
+        "Reaction_Time": np.asarray(reaction, dtype=float),
+        "Memory_Test_Score": np.asarray(memory, dtype=float),
+        "Age": np.asarray(age, dtype=float),
+        "Gender": [normalize_gender(g) for g in gender],
+    })
+    n = len(X)
+
+    stress_idx = _model_stress.predict(X).astype(int) if _model_stress else np.ones(n, dtype=int)
+    cog_raw = _model_cog.predict(X).astype(float) if _model_cog else np.full(n, 0.5)
+
+    stress = [STRESS_MAP.get(int(i), "medium") for i in stress_idx]
+    cognitive = np.clip(np.round(cog_raw * 100), 0, 100).astype(int)
+    return stress, cognitive.tolist()
+
+
+def cached_scores(reaction, memory, age, gender):
+    key = _prediction_key(reaction, memory, age, gender)
+    with _prediction_cache_lock:
+        return _prediction_cache.get(key)
@@ -3,6 +3,7 @@ import numpy as np
 import pandas as pd
 import joblib
 from backend.ml.feature_engineering import FeatureEngineer
+from backend.ml.drift import build_reference_profile, save_reference_profile
 
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
@@ -184,4 +185,15 @@ print("R2:", r2_score(y_cog_test * 100, cog_preds))
 
 joblib.dump(cog_model, os.path.join(OUT_DIR, "model_cognitive.pkl"))
 
+# Reference distributions for production drift monitoring (backend/ml/drift.py)
+STRESS_LABELS = {0: "low", 1: "medium", 2: "high"}
+
+profile = build_reference_profile(
+    X_test,
+    [STRESS_LABELS[int(i)] for i in stress_preds],
+    cog_preds
+)
+save_reference_profile(profile, os.path.join(OUT_DIR, "reference_profile.json"))
+print("\nReference profile saved for drift monitoring")
+
 print("\n✅ SOTA TRAINING COMPLETE — PLAYWELL READY")
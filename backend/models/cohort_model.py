@@ -0,0 +1,55 @@
+# backend/models/cohort_model.py
+from backend.database import db
+from datetime import datetime
+
+class CohortHistogram(db.Model):
+    __tablename__ = "cohort_histogram"
+    __table_args__ = (
+        db.UniqueConstraint("game_type", "age_band", "gender", "metric"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    game_type = db.Column(db.String(50), nullable=False)
+    age_band = db.Column(db.String(10), nullable=False)
+    gender = db.Column(db.String(10), nullable=False)
+    metric = db.Column(db.String(30), nullable=False)
+
+    # Cumulative counts per fixed bin, packed little-endian uint32
+    # (see backend/cohorts.py for the bin edges). Refreshed by
+    # `compact`/`rebuild`; newer values wait in cohort_bin_count.
+    cum_counts = db.Column(db.LargeBinary, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return (
+            f"<CohortHistogram {self.game_type}/{self.age_band}/"
+            f"{self.gender}/{self.metric}>"
+        )
+
+
+class CohortBinCount(db.Model):
+    # Pending counts not yet folded into cohort_histogram: one counter per
+    # bin, bumped by submits with an atomic UPDATE ... SET count = count + 1.
+    # Bins with nothing pending have no row.
+    __tablename__ = "cohort_bin_count"
+    __table_args__ = (
+        db.UniqueConstraint("game_type", "age_band", "gender", "metric", "bin"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    game_type = db.Column(db.String(50), nullable=False)
+    age_band = db.Column(db.String(10), nullable=False)
+    gender = db.Column(db.String(10), nullable=False)
+    metric = db.Column(db.String(30), nullable=False)
+    bin = db.Column(db.Integer, nullable=False)
+
+    count = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<CohortBinCount {self.game_type}/{self.age_band}/"
+            f"{self.gender}/{self.metric}[{self.bin}]={self.count}>"
+        )
@@ -4,6 +4,10 @@ from datetime import datetime
 
 class GameSession(db.Model):
     __tablename__ = "game_session"
+    __table_args__ = (
+        # Every hot query is per user, newest first
+        db.Index("ix_game_session_user_id_id", "user_id", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -46,3 +50,30 @@ class AnalysisResult(db.Model):
 
     def __repr__(self):
         return f"<AnalysisResult session_id={self.session_id}>"
+
+
+class SessionTrials(db.Model):
+    # Per-trial data of one session, packed as little-endian arrays
+    # (see backend/trials.py): reaction_ms float32, correct uint8.
+    __tablename__ = "session_trials"
+
+    session_id = db.Column(
+        db.Integer,
+        db.ForeignKey("game_session.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    n_trials = db.Column(db.Integer, nullable=False)
+    reaction_ms = db.Column(db.LargeBinary, nullable=True)
+    correct = db.Column(db.LargeBinary, nullable=True)
+
+    # Summaries computed at ingest so they can be queried without decoding
+    rt_mean = db.Column(db.Float)
+    rt_median = db.Column(db.Float)
+    rt_sd = db.Column(db.Float)
+    rt_iqr = db.Column(db.Float)
+    lapses = db.Column(db.Integer)
+    accuracy = db.Column(db.Float)
+
+    def __repr__(self):
+        return f"<SessionTrials session_id={self.session_id} n={self.n_trials}>"
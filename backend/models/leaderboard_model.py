@@ -0,0 +1,35 @@
+# backend/models/leaderboard_model.py
+from backend.database import db
+from datetime import datetime
+
+class LeaderboardEntry(db.Model):
+    # A user's best value on one board (game_type + metric) for one period:
+    # "all", "week:2026-W42" or "day:2026-10-19".
+    __tablename__ = "leaderboard_entry"
+    __table_args__ = (
+        db.UniqueConstraint("game_type", "metric", "period", "user_id"),
+        # Top-k scans and rank counts
+        db.Index("ix_leaderboard_board_value", "game_type", "metric", "period", "value"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    game_type = db.Column(db.String(50), nullable=False)
+    metric = db.Column(db.String(30), nullable=False)
+    period = db.Column(db.String(20), nullable=False)
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("user.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    session_id = db.Column(db.Integer, nullable=True)
+    value = db.Column(db.Float, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return (
+            f"<LeaderboardEntry {self.game_type}/{self.metric}/{self.period} "
+            f"user={self.user_id} value={self.value}>"
+        )
@@ -0,0 +1,33 @@
+# backend/models/shard_model.py
+from backend.database import db
+from datetime import datetime
+
+class UserShard(db.Model):
+    # Directory: which shard holds a user's sessions. Rows are pinned on
+    # first use so adding shards never moves users implicitly.
+    __tablename__ = "user_shard"
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("user.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    shard = db.Column(db.Integer, nullable=False)
+    # "active", or "moving" while backend/sharding.py migrates the user
+    state = db.Column(db.String(10), nullable=False, default="active")
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<UserShard user={self.user_id} shard={self.shard} {self.state}>"
+
+
+class ShardMoveLog(db.Model):
+    # Lives on the destination shard: the rows copied by an unfinished
+    # move (old -> new session id), written in the same transaction as
+    # the copy, so a rerun knows exactly what it already inserted.
+    __tablename__ = "shard_move_log"
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    old_session_id = db.Column(db.Integer, primary_key=True)
+    new_session_id = db.Column(db.Integer, nullable=False)
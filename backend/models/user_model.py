@@ -26,3 +26,20 @@ class User(db.Model):
 
     def __repr__(self):
         return f"<User id={self.id} email={self.email}>"
+
+
+class UserDataVersion(db.Model):
+    # Counter bumped whenever a user's sessions/profile change. Used to
+    # build ETags and validate cached dashboard responses cheaply.
+    __tablename__ = "user_data_version"
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("user.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<UserDataVersion user={self.user_id} v={self.version}>"
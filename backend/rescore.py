@@ -0,0 +1,303 @@
+# backend/rescore.py
+#
+# Re-scores stored sessions with the current models, e.g. after a new
+# model ships:
+#
+#   python -m backend.rescore [--chunk-size 5000] [--workers N] [--restart]
+#
+# Sessions are streamed in (user_id, id) keyset order, so each user's
+# sessions arrive chronologically and the history-median fallback for a
+# missing reaction/memory value is rebuilt exactly as /game/submit computed
+# it (median over the user's sessions up to and including this one).
+# Chunks are scored with predict_batch in a process pool while the main
+# process keeps reading and writing. Progress is checkpointed after every
+# written chunk; rerunning resumes from the checkpoint.
+
+import argparse
+import bisect
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import bindparam, select, text
+
+from backend.config import RESCORE_CHECKPOINT_PATH
+from backend.database import db
+from backend.ml.inference import predict_batch
+from backend.models.game_model import AnalysisResult
+from backend.routes.game_routes import (
+    DEFAULT_REACTION, DEFAULT_MEMORY, DEFAULT_AGE, DEFAULT_GENDER,
+    generate_recommendations,
+)
+from backend.sharding import session_engines, sharding_enabled
+
+SESSIONS_QUERY = """
+    SELECT s.id, s.user_id, s.reaction_time_avg, s.memory_score{user_columns}
+    FROM game_session s{user_join}
+    WHERE {where}
+    ORDER BY s.user_id, s.id
+    {limit}
+"""
+
+# Row-value comparison: an index range condition on (user_id, id) in both
+# Postgres and SQLite >= 3.15, unlike the equivalent OR form
+AFTER = "(s.user_id, s.id) > (:user_id, :id)"
+
+
+def _sessions_query(where, limit=True):
+    # With sharding the user table is on the primary, not next to the sessions
+    join = not sharding_enabled()
+    return text(SESSIONS_QUERY.format(
+        user_columns=", u.age, u.gender" if join else "",
+        user_join=' JOIN "user" u ON u.id = s.user_id' if join else "",
+        where=where,
+        limit="LIMIT :limit" if limit else "",
+    ))
+
+
+def _user_attributes(user_ids):
+    with db.engine.connect() as conn:
+        rows = conn.execute(
+            text('SELECT id, age, gender FROM "user" WHERE id IN :ids')
+            .bindparams(bindparam("ids", expanding=True)),
+            {"ids": sorted(user_ids)}
+        ).all()
+    return {r.id: (r.age, r.gender) for r in rows}
+
+
+def _fetch_chunk(conn, after, chunk_size):
+    rows = conn.execute(_sessions_query(AFTER), {
+        "user_id": after[0], "id": after[1], "limit": chunk_size
+    }).all()
+    if sharding_enabled() and rows:
+        users = _user_attributes({r.user_id for r in rows})
+        rows = [(r.id, r.user_id, r.reaction_time_avg, r.memory_score,
+                 *users.get(r.user_id, (None, None))) for r in rows]
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Inputs (same rules as submit_game)
+# ---------------------------------------------------------------------------
+
+def _median(sorted_values, default):
+    n = len(sorted_values)
+    if not n:
+        return default
+    mid = n // 2
+    return float(sorted_values[mid] if n % 2 else (sorted_values[mid - 1] + sorted_values[mid]) / 2)
+
+
+class InputBuilder:
+    """Turns sessions, in (user_id, id) order, into model inputs. Keeps
+    the current user's past values sorted for the running medians."""
+
+    def __init__(self):
+        self.user_id = None
+        self.reactions = []
+        self.memories = []
+
+    def _switch(self, user_id):
+        if user_id != self.user_id:
+            self.user_id = user_id
+            self.reactions = []
+            self.memories = []
+
+    def seed(self, conn, user_id, last_id):
+        """Restores the state for a resume in the middle of a user."""
+        self._switch(user_id)
+        for row in conn.execute(_sessions_query("s.user_id = :user_id AND s.id <= :id", limit=False),
+                                {"user_id": user_id, "id": last_id}):
+            self._push(row.reaction_time_avg, row.memory_score)
+
+    def _push(self, reaction, memory):
+        if reaction is not None:
+            bisect.insort(self.reactions, reaction)
+        if memory is not None:
+            bisect.insort(self.memories, memory)
+
+    def build(self, rows):
+        ids, reaction, memory, age, gender = [], [], [], [], []
+        for session_id, user_id, r, m, user_age, user_gender in rows:
+            self._switch(user_id)
+            self._push(r, m)
+            ids.append(session_id)
+            reaction.append(r if r is not None else _median(self.reactions, DEFAULT_REACTION))
+            memory.append(m if m is not None else _median(self.memories, DEFAULT_MEMORY))
+            age.append(user_age or DEFAULT_AGE)
+            gender.append(user_gender or DEFAULT_GENDER)
+        return ids, (reaction, memory, age, gender)
+
+
+# ---------------------------------------------------------------------------
+# Writes
+# ---------------------------------------------------------------------------
+
+def write_scores(engine, ids, stress, cognitive):
+    """Updates the analysis rows of these sessions in bulk and inserts the
+    missing ones. Recommendations are only regenerated for rows whose
+    scores changed. Returns (changed, inserted)."""
+    ar = AnalysisResult.__table__
+    scores = dict(zip(ids, zip(stress, cognitive)))
+
+    with engine.begin() as conn:
+        existing = {
+            r.session_id: (r.stress_level, r.cognitive_score)
+            for r in conn.execute(
+                select(ar.c.session_id, ar.c.stress_level, ar.c.cognitive_score)
+                .where(ar.c.session_id.in_(ids))
+            )
+        }
+
+        updates, inserts = [], []
+        for session_id, (s, c) in scores.items():
+            row = {
+                "sid": session_id, "stress_level": s, "cognitive_score": c,
+                "recommendations": json.dumps(generate_recommendations(s, c)),
+            }
+            old = existing.get(session_id)
+            if old is None:
+                inserts.append(row)
+            elif old != (s, c):
+                updates.append(row)
+
+        if updates:
+            conn.execute(
+                ar.update()
+                .where(ar.c.session_id == bindparam("sid"))
+                .values(
+                    stress_level=bindparam("stress_level"),
+                    cognitive_score=bindparam("cognitive_score"),
+                    recommendations=bindparam("recommendations"),
+                ),
+                updates
+            )
+        if inserts:
+            conn.execute(ar.insert(), [
+                {"session_id": r.pop("sid"), **r} for r in inserts
+            ])
+
+    return len(updates), len(inserts)
+
+
+# ---------------------------------------------------------------------------
+# Checkpoint
+# ---------------------------------------------------------------------------
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, state):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def rescore(chunk_size=5000, workers=None, checkpoint_path=RESCORE_CHECKPOINT_PATH,
+            restart=False):
+    workers = workers or os.cpu_count() or 1
+    state = None if restart else load_checkpoint(checkpoint_path)
+    if state:
+        print(f"resuming from shard {state['shard']}, user {state['user_id']}, "
+              f"session {state['id']} ({state['rows']} rows done)")
+    else:
+        state = {"shard": 0, "user_id": 0, "id": 0, "rows": 0, "changed": 0, "inserted": 0}
+
+    started = time.monotonic()
+    rows_at_start = state["rows"]
+
+    def report(final=False):
+        elapsed = time.monotonic() - started
+        rate = (state["rows"] - rows_at_start) / elapsed if elapsed else 0.0
+        print(f"{'done: ' if final else ''}{state['rows']} rows "
+              f"({state['changed']} changed, {state['inserted']} inserted), "
+              f"{rate:.0f} rows/s")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for shard, engine in enumerate(session_engines()):
+            if shard < state["shard"]:
+                continue
+            if shard > state["shard"]:
+                state.update(shard=shard, user_id=0, id=0)
+
+            builder = InputBuilder()
+            in_flight = deque()
+
+            def drain(limit):
+                while len(in_flight) > limit:
+                    ids, last, future = in_flight.popleft()
+                    changed, inserted = write_scores(engine, ids, *future.result())
+                    state.update(user_id=last[0], id=last[1])
+                    state["rows"] += len(ids)
+                    state["changed"] += changed
+                    state["inserted"] += inserted
+                    save_checkpoint(checkpoint_path, state)
+                    report()
+
+            with engine.connect() as conn:
+                after = (state["user_id"], state["id"])
+                if state["id"]:
+                    builder.seed(conn, *after)
+
+                while True:
+                    rows = _fetch_chunk(conn, after, chunk_size)
+                    if not rows:
+                        break
+                    after = (rows[-1][1], rows[-1][0])
+                    ids, inputs = builder.build(rows)
+                    in_flight.append((ids, after, pool.submit(predict_batch, *inputs)))
+                    # Bounded read-ahead keeps every worker busy
+                    drain(2 * workers)
+
+            drain(0)
+
+    if state["changed"] or state["inserted"]:
+        # Every user's history/stats may have changed; invalidate ETags
+        with db.engine.begin() as conn:
+            conn.execute(text("UPDATE user_data_version SET version = version + 1"))
+
+    report(final=True)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score stored sessions with the current models")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="scoring processes (default: CPU count)")
+    parser.add_argument("--checkpoint", default=RESCORE_CHECKPOINT_PATH)
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore an existing checkpoint and start over")
+    parser.add_argument("--no-rebuild", action="store_true",
+                        help="don't rebuild leaderboards/cohorts afterwards")
+    args = parser.parse_args(argv)
+
+    from backend.app import create_app
+    app = create_app()
+    with app.app_context():
+        state = rescore(args.chunk_size, args.workers, args.checkpoint, args.restart)
+
+        # Both index cognitive_score; rebuild them from the new values
+        if state["changed"] or state["inserted"]:
+            if not args.no_rebuild:
+                from backend import cohorts, leaderboards
+                leaderboards.rebuild()
+                cohorts.rebuild()
+
+
+if __name__ == "__main__":
+    main()
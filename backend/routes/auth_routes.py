@@ -5,6 +5,7 @@ from backend.database import db
 import jwt
 import datetime
 from backend.config import SECRET_KEY
+from backend.utils.offload import offload
 
 auth_bp = Blueprint("auth_bp", __name__)
 
@@ -20,7 +21,7 @@ def register():
     user = User(
     name=data["name"],
     email=data["email"],
-    password=generate_password_hash(data["password"]),
+    password=offload(generate_password_hash, data["password"]),
     age=int(data["age"]),
     gender=data["gender"]
     )
@@ -34,7 +35,7 @@ def login():
     data = request.json or {}
 
     user = User.query.filter_by(email=data.get("email")).first()
-    if not user or not check_password_hash(user.password, data.get("password", "")):
+    if not user or not offload(check_password_hash, user.password, data.get("password", "")):
         return jsonify({"error": "Invalid credentials"}), 401
 
     token = jwt.encode({
@@ -1,20 +1,25 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response
 from backend.database import db
-from backend.models.game_model import GameSession, AnalysisResult
+from backend.models.game_model import GameSession, AnalysisResult, SessionTrials
 from backend.utils.auth_middleware import token_required
-
-import joblib, json, os, statistics
-import pandas as pd
+from backend.utils.admission import admission_control, rate_limited
+from backend.utils.response_cache import bump_user_version
+from backend.cohorts import record_values
+from backend import leaderboards
+from backend.trials import build_trials_row, unpack_rt, unpack_correct
+from backend.config import (
+    PREDICT_MAX_CONCURRENT, PREDICT_MAX_QUEUE, PREDICT_RATE, PREDICT_BURST,
+    PREDICT_DEGRADE,
+    SUBMIT_MAX_CONCURRENT, SUBMIT_MAX_QUEUE, SUBMIT_RATE, SUBMIT_BURST,
+)
+from backend.ml.inference import (
+    STRESS_MAP, predict_scores, cached_scores
+)
+
+import json, statistics
 
 game_bp = Blueprint("game_bp", __name__)
 
-ML_DIR = os.path.join(os.path.dirname(__file__), "..", "ml")
-MODEL_STRESS_PATH = os.path.join(ML_DIR, "model_stress.pkl")
-MODEL_COG_PATH = os.path.join(ML_DIR, "model_cognitive.pkl")
-
-_model_stress = joblib.load(MODEL_STRESS_PATH) if os.path.exists(MODEL_STRESS_PATH) else None
-_model_cog = joblib.load(MODEL_COG_PATH) if os.path.exists(MODEL_COG_PATH) else None
-
 DEFAULT_REACTION = 300.0
 DEFAULT_MEMORY = 70.0
 DEFAULT_AGE = 25
@@ -35,15 +40,12 @@ DUAL_GAMES = {
     "Stroop Test"
 }
 
-STRESS_MAP = {
-    0: "low",
-    1: "medium",
-    2: "high"
-}
 
-def normalize_gender(gender):
-    g = str(gender).strip().lower()
-    return "Female" if g in ("female", "f", "woman") else "Male"
+def _int_or_zero(value):
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
 
 
 def median_or_default(values, default):
@@ -51,14 +53,6 @@ def median_or_default(values, default):
     return float(statistics.median(clean)) if clean else default
 
 
-def build_model_input(reaction, memory, age, gender):
-    return pd.DataFrame([{
-        "Reaction_Time": float(reaction),
-        "Memory_Test_Score": float(memory),
-        "Age": float(age),
-        "Gender": normalize_gender(gender),
-    }])
-
 import random
 
 def generate_recommendations(stress, cognitive):
@@ -94,31 +88,50 @@ def generate_recommendations(stress, cognitive):
 
     return random.choice(LOW_STRESS)
 
-@game_bp.route("/game/predict", methods=["POST"])
-def predict_game():
+def _predict_inputs(data):
+    reaction = data.get("reaction_avg")
+    memory = data.get("memory_score")
+    age = data.get("age") or DEFAULT_AGE
+    gender = data.get("gender") or DEFAULT_GENDER
+
+    reaction_final = float(reaction) if reaction is not None else DEFAULT_REACTION
+    memory_final = float(memory) if memory is not None else DEFAULT_MEMORY
+
+    return reaction_final, memory_final, age, gender
+
+
+def _degraded_prediction():
     try:
-        data = request.json or {}
+        cached = cached_scores(*_predict_inputs(request.json or {}))
+    except Exception:
+        cached = None
 
-        reaction = data.get("reaction_avg")
-        memory = data.get("memory_score")
-        age = data.get("age") or DEFAULT_AGE
-        gender = data.get("gender") or DEFAULT_GENDER
+    stress_pred, cognitive = cached or (STRESS_MAP[1], 50)
 
-        reaction_final = float(reaction) if reaction is not None else DEFAULT_REACTION
-        memory_final = float(memory) if memory is not None else DEFAULT_MEMORY
+    resp = jsonify({
+        "stress_level": stress_pred,
+        "cognitive_score": cognitive,
+        "focus_score": cognitive,
+        "recommendations": generate_recommendations(stress_pred, cognitive),
+        "degraded": True
+    })
+    resp.headers["Retry-After"] = "1"
+    return resp
 
-        X = build_model_input(
-            reaction_final,
-            memory_final,
-            age,
-            gender
-        )
 
-        stress_idx = int(_model_stress.predict(X)[0]) if _model_stress else 1
-        stress_pred = STRESS_MAP.get(stress_idx, "medium")
+@game_bp.route("/game/predict", methods=["POST"])
+@rate_limited("predict", PREDICT_RATE, PREDICT_BURST)
+@admission_control(
+    "predict",
+    PREDICT_MAX_CONCURRENT,
+    PREDICT_MAX_QUEUE,
+    fallback=_degraded_prediction if PREDICT_DEGRADE else None
+)
+def predict_game():
+    try:
+        data = request.json or {}
 
-        cog_raw = float(_model_cog.predict(X)[0]) if _model_cog else 0.5
-        cognitive = int(max(0, min(100, round(cog_raw * 100))))
+        stress_pred, cognitive = predict_scores(*_predict_inputs(data))
 
         return jsonify({
             "stress_level": stress_pred,
@@ -133,13 +146,17 @@ def predict_game():
 
 @game_bp.route("/game/submit", methods=["POST"])
 @token_required
+@rate_limited("submit", SUBMIT_RATE, SUBMIT_BURST)
+@admission_control("submit", SUBMIT_MAX_CONCURRENT, SUBMIT_MAX_QUEUE)
 def submit_game(current_user):
     try:
         data = request.json or {}
 
         game_type = data.get("gameType", "unknown")
         duration_ms = data.get("durationMs", 0)
-        meta = data.get("meta", {})
+        meta = data.get("meta")
+        if not isinstance(meta, dict):
+            meta = {}
 
         raw_reaction = data.get("reaction_avg")
         raw_memory = data.get("memory_score")
@@ -157,7 +174,7 @@ def submit_game(current_user):
             game_type=game_type,
             reaction_time_avg=reaction,
             memory_score=memory,
-            errors=int(meta.get("errors", 0)),
+            errors=_int_or_zero(meta.get("errors")),
             duration=(duration_ms or 0) / 1000.0
         )
 
@@ -187,19 +204,13 @@ def submit_game(current_user):
         age = current_user.age or DEFAULT_AGE
         gender = current_user.gender or DEFAULT_GENDER
 
-        X = build_model_input(
+        stress_pred, cognitive = predict_scores(
             reaction_final,
             memory_final,
             age,
             gender
         )
 
-        stress_idx = int(_model_stress.predict(X)[0]) if _model_stress else 1
-        stress_pred = STRESS_MAP.get(stress_idx, "medium")
-
-        cog_raw = float(_model_cog.predict(X)[0]) if _model_cog else 0.5
-        cognitive = int(max(0, min(100, round(cog_raw * 100))))
-
         analysis = AnalysisResult(
             session_id=session.id,
             stress_level=stress_pred,
@@ -210,8 +221,48 @@ def submit_game(current_user):
         )
 
         db.session.add(analysis)
+        # Bumped with the analysis, not the bare session: a history poll
+        # between the two commits must not be cached under the new version
+        bump_user_version(current_user.id)
+
+        # Trial data is client-shaped: never fail the submit over it
+        trials = None
+        try:
+            trials = build_trials_row(session.id, meta)
+            if trials is not None:
+                db.session.add(trials)
+        except Exception as e:
+            print("trials extract error:", e)
+
+        update_leaderboard_cache = None
+        try:
+            with db.session.begin_nested():
+                update_leaderboard_cache = leaderboards.record_values(
+                    current_user, game_type, session.id, {
+                        "reaction_time_avg": reaction,
+                        "memory_score": memory,
+                        "cognitive_score": cognitive
+                    }
+                )
+        except Exception as e:
+            print("leaderboard update error:", e)
+
         db.session.commit()
 
+        if update_leaderboard_cache:
+            update_leaderboard_cache()
+
+        # Peer histograms are a side index: never fail the submit over them.
+        # Bumped after the commit, in a short transaction of their own.
+        try:
+            record_values(game_type, age, gender, {
+                "reaction_time_avg": reaction,
+                "memory_score": memory,
+                "cognitive_score": cognitive
+            })
+        except Exception as e:
+            print("cohort update error:", e)
+
         return jsonify({
             "session_id": session.id,
             "stress_level": stress_pred,
@@ -219,9 +270,53 @@ def submit_game(current_user):
             "focus_score": cognitive,
             "reaction_used": reaction_final,
             "memory_used": memory_final,
+            "trial_summary": {
+                "n_trials": trials.n_trials,
+                "rt_mean": trials.rt_mean,
+                "rt_median": trials.rt_median,
+                "rt_sd": trials.rt_sd,
+                "rt_iqr": trials.rt_iqr,
+                "lapses": trials.lapses,
+                "accuracy": trials.accuracy
+            } if trials is not None else None,
             "recommendations": generate_recommendations(stress_pred, cognitive)
         })
 
     except Exception as e:
         print("submit_game error:", e)
         return jsonify({"error": "Internal server error"}), 500
+
+
+@game_bp.route("/game/trials/<int:session_id>")
+@token_required
+def get_trials(current_user, session_id):
+    session = db.session.get(GameSession, session_id)
+    if not session or session.user_id != current_user.id:
+        return jsonify({"error": "Session not found"}), 404
+
+    trials = db.session.get(SessionTrials, session_id)
+    if not trials:
+        return jsonify({"error": "No trial data for this session"}), 404
+
+    # Raw little-endian float32 reaction times, served without decoding
+    if request.args.get("format") == "raw":
+        resp = make_response(bytes(trials.reaction_ms or b""))
+        resp.mimetype = "application/octet-stream"
+        resp.headers["X-Trial-Count"] = str(trials.n_trials)
+        resp.headers["X-Trial-Dtype"] = "<f4"
+        return resp
+
+    return jsonify({
+        "session_id": session_id,
+        "n_trials": trials.n_trials,
+        "reaction_ms": unpack_rt(trials.reaction_ms).tolist(),
+        "correct": unpack_correct(trials.correct).astype(bool).tolist(),
+        "summary": {
+            "rt_mean": trials.rt_mean,
+            "rt_median": trials.rt_median,
+            "rt_sd": trials.rt_sd,
+            "rt_iqr": trials.rt_iqr,
+            "lapses": trials.lapses,
+            "accuracy": trials.accuracy
+        }
+    })
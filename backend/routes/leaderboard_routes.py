@@ -0,0 +1,42 @@
+# backend/routes/leaderboard_routes.py
+from flask import Blueprint, request, jsonify
+from backend.utils.auth_middleware import token_required
+from backend.leaderboards import METRICS, WINDOWS, top, user_rank
+from backend.config import LEADERBOARD_SIZE
+
+leaderboard_bp = Blueprint("leaderboard_bp", __name__)
+
+@leaderboard_bp.route("/leaderboard")
+@token_required
+def get_leaderboard(current_user):
+    game_type = request.args.get("game_type")
+    metric = request.args.get("metric", "cognitive_score")
+    window = request.args.get("window", "all")
+
+    if not game_type:
+        return jsonify({"error": "game_type is required"}), 400
+    if metric not in METRICS:
+        return jsonify({"error": f"metric must be one of {sorted(METRICS)}"}), 400
+    if window not in WINDOWS:
+        return jsonify({"error": f"window must be one of {list(WINDOWS)}"}), 400
+
+    try:
+        limit = max(1, min(LEADERBOARD_SIZE, int(request.args.get("limit", 10))))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    rows = top(game_type, metric, window, limit)
+
+    # Ties share a rank (1, 2, 2, 4), matching user_rank()
+    entries = []
+    for i, row in enumerate(rows):
+        tied = entries and entries[-1]["value"] == row["value"]
+        entries.append({"rank": entries[-1]["rank"] if tied else i + 1, **row})
+
+    return jsonify({
+        "game_type": game_type,
+        "metric": metric,
+        "window": window,
+        "entries": entries,
+        "me": user_rank(current_user.id, game_type, metric, window)
+    })
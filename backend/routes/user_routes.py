@@ -4,6 +4,12 @@ from backend.models.user_model import User
 from backend.models.game_model import GameSession, AnalysisResult
 from backend.database import db
 from backend.utils.auth_middleware import token_required
+from backend.utils.response_cache import cached_user_response, bump_user_version
+from backend.utils.read_routing import replica_reads
+from backend.archive import read_archived_history
+from backend.cohorts import METRIC_BINS, age_band, percentile
+from backend.ml.inference import normalize_gender
+from datetime import datetime
 
 user_bp = Blueprint("user_bp", __name__)
 
@@ -21,8 +27,13 @@ def get_profile(current_user, user_id):
         "gender": current_user.gender
     })
 
+def _include_archive():
+    return request.args.get("include_archive", "").lower() in ("1", "true", "yes")
+
 @user_bp.route("/user/history/<int:user_id>")
 @token_required
+@cached_user_response("history", variant=lambda: "archive" if _include_archive() else "hot")
+@replica_reads
 def get_history(current_user, user_id):
     if current_user.id != user_id:
         return jsonify({"error": "Unauthorized access"}), 403
@@ -51,6 +62,10 @@ def get_history(current_user, user_id):
             "recommendations": result.recommendations if result else None
         })
 
+    # Sessions moved to the cold Parquet archive (see backend/archive.py)
+    if _include_archive():
+        output.extend(read_archived_history(user_id))
+
     return jsonify(output)
 
 @user_bp.route("/user/update/<int:user_id>", methods=["PUT"])
@@ -65,6 +80,7 @@ def update_profile(current_user, user_id):
     current_user.age = data.get("age", current_user.age)
     current_user.email = data.get("email", current_user.email)
 
+    bump_user_version(current_user.id)
     db.session.commit()
 
     return jsonify({
@@ -77,8 +93,14 @@ def update_profile(current_user, user_id):
         }
     })
 
+def _stats_window():
+    # Stats cover a rolling 7-day window, so cached copies also expire hourly
+    return datetime.utcnow().strftime("%Y%m%d%H")
+
 @user_bp.route("/user/stats/<int:user_id>")
 @token_required
+@cached_user_response("stats", variant=_stats_window)
+@replica_reads
 def get_user_stats(current_user, user_id):
     if current_user.id != user_id:
         return jsonify({"error": "Unauthorized"}), 403
@@ -122,4 +144,46 @@ def get_user_stats(current_user, user_id):
     return jsonify({
         "mood": mood,
         "favorite_game": favorite_game,
-    })
\ No newline at end of file
+    })
+
+@user_bp.route("/user/percentile/<int:user_id>")
+@token_required
+def get_percentile(current_user, user_id):
+    if current_user.id != user_id:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    # Rank the user's latest session (of the requested game, if given)
+    query = GameSession.query.filter_by(user_id=user_id)
+    game_type = request.args.get("game_type")
+    if game_type:
+        query = query.filter_by(game_type=game_type)
+    session = query.order_by(GameSession.id.desc()).first()
+
+    if not session:
+        return jsonify({"error": "No sessions found"}), 404
+
+    result = AnalysisResult.query.filter_by(session_id=session.id).first()
+    values = {
+        "reaction_time_avg": session.reaction_time_avg,
+        "memory_score": session.memory_score,
+        "cognitive_score": result.cognitive_score if result else None,
+    }
+
+    return jsonify({
+        "session_id": session.id,
+        "game_type": session.game_type,
+        "cohort": {
+            "age_band": age_band(current_user.age),
+            "gender": normalize_gender(current_user.gender),
+        },
+        "metrics": {
+            metric: percentile(
+                session.game_type,
+                current_user.age,
+                current_user.gender,
+                metric,
+                values[metric]
+            )
+            for metric in METRIC_BINS
+        }
+    })
@@ -0,0 +1,365 @@
+# backend/sharding.py
+#
+# Optional user-id sharding for the per-session tables (game_session,
+# analysis_result, session_trials). Enabled by DATABASE_SHARD_URLS; the
+# user table, directory, leaderboards, cohorts etc. stay on the primary.
+#
+# - New users are placed by a consistent hash of user_id and pinned in the
+#   user_shard directory, so adding shards never moves anyone implicitly.
+# - token_required selects the caller's shard for the request (g.shard_key)
+#   and RoutingSession sends the sharded tables there.
+# - fan_out() runs a callable against every engine holding session tables
+#   (all shards, or just the primary when sharding is off) for admin-wide
+#   jobs.
+#
+#   python -m backend.sharding init                  # create tables on every shard
+#   python -m backend.sharding import-primary        # move existing rows off the primary
+#   python -m backend.sharding move --user 42 --to 1
+#   python -m backend.sharding rebalance             # after adding shards
+
+import argparse
+import bisect
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import g
+from sqlalchemy import case, select, delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateTable
+
+from backend.config import DATABASE_SHARD_URLS, SHARD_DIRECTORY_TTL
+from backend.database import db, shard_bind_key, SHARDED_TABLES
+from backend.models.game_model import GameSession, AnalysisResult, SessionTrials
+from backend.models.shard_model import UserShard, ShardMoveLog
+from backend.models.leaderboard_model import LeaderboardEntry
+from backend.models.user_model import User
+
+VNODES = 128
+
+_directory = {}
+_directory_lock = threading.Lock()
+
+
+def sharding_enabled():
+    return bool(DATABASE_SHARD_URLS)
+
+
+# ---------------------------------------------------------------------------
+# Placement
+# ---------------------------------------------------------------------------
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    def __init__(self, n_shards, vnodes=VNODES):
+        points = sorted(
+            (_hash(f"shard-{shard}-{v}"), shard)
+            for shard in range(n_shards) for v in range(vnodes)
+        )
+        self._keys = [p for p, _ in points]
+        self._shards = [s for _, s in points]
+
+    def shard_for(self, user_id):
+        i = bisect.bisect(self._keys, _hash(f"user-{user_id}")) % len(self._keys)
+        return self._shards[i]
+
+
+ring = HashRing(len(DATABASE_SHARD_URLS)) if DATABASE_SHARD_URLS else None
+
+
+def shard_for_user(user_id):
+    """Returns (shard index, state) from the directory, pinning new users.
+    Cached per process for SHARD_DIRECTORY_TTL seconds."""
+    now = time.monotonic()
+    with _directory_lock:
+        cached = _directory.get(user_id)
+    if cached and cached[2] > now:
+        return cached[0], cached[1]
+
+    row = db.session.get(UserShard, user_id)
+    if row is None:
+        try:
+            db.session.add(UserShard(user_id=user_id, shard=ring.shard_for(user_id), state="active"))
+            db.session.commit()
+        except IntegrityError:
+            # Pinned concurrently by another request (e.g. parallel page loads)
+            db.session.rollback()
+        row = db.session.get(UserShard, user_id)
+
+    with _directory_lock:
+        _directory[user_id] = (row.shard, row.state, now + SHARD_DIRECTORY_TTL)
+    return row.shard, row.state
+
+
+def use_user_shard(user_id):
+    """Selects the user's shard for the rest of this app context. Returns
+    False while the user is being moved between shards."""
+    if not sharding_enabled():
+        return True
+    shard, state = shard_for_user(user_id)
+    if state != "active":
+        return False
+    g.shard_key = shard_bind_key(shard)
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Engines / fan-out
+# ---------------------------------------------------------------------------
+
+def shard_engine(index):
+    return db.engines[shard_bind_key(index)]
+
+
+def session_engines():
+    """Engines holding session tables: every shard, or the primary."""
+    if not sharding_enabled():
+        return [db.engine]
+    return [shard_engine(i) for i in range(len(DATABASE_SHARD_URLS))]
+
+
+def fan_out(fn, *args, **kwargs):
+    """Runs fn(engine, *args, **kwargs) on every session engine in parallel
+    and returns the results in shard order."""
+    engines = session_engines()
+    if len(engines) == 1:
+        return [fn(engines[0], *args, **kwargs)]
+    with ThreadPoolExecutor(max_workers=len(engines)) as pool:
+        return list(pool.map(lambda e: fn(e, *args, **kwargs), engines))
+
+
+def create_shard_tables():
+    """Creates the sharded tables on every shard. FKs to tables that stay
+    on the primary (user) are left out; FKs between sharded tables stay."""
+    tables = [t for t in db.metadata.sorted_tables if t.name in SHARDED_TABLES]
+    for i in range(len(DATABASE_SHARD_URLS)):
+        engine = shard_engine(i)
+        with engine.begin() as conn:
+            for table in tables:
+                if engine.dialect.has_table(conn, table.name):
+                    continue
+                fks = [
+                    fk for fk in table.foreign_key_constraints
+                    if fk.referred_table.name in SHARDED_TABLES
+                ]
+                conn.execute(CreateTable(table, include_foreign_key_constraints=fks))
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+
+
+# ---------------------------------------------------------------------------
+# Moving users
+# ---------------------------------------------------------------------------
+
+def _copy_user(src, dst, user_id):
+    """Copies one user's rows src -> dst (new ids on dst) and returns the
+    old -> new session id map. Rows the user already has on dst are left
+    alone; the copy and its shard_move_log entries commit together, so a
+    rerun of an interrupted move reuses the log instead of copying again."""
+    gs, ar, st = GameSession.__table__, AnalysisResult.__table__, SessionTrials.__table__
+    log = ShardMoveLog.__table__
+
+    with dst.connect() as conn:
+        logged = conn.execute(
+            select(log.c.old_session_id, log.c.new_session_id).where(log.c.user_id == user_id)
+        ).all()
+    if logged:
+        return dict(logged)
+
+    with src.connect() as conn:
+        sessions = conn.execute(
+            select(gs).where(gs.c.user_id == user_id).order_by(gs.c.id)
+        ).mappings().all()
+        ids = [s["id"] for s in sessions]
+        analyses, trials = [], []
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            analyses += conn.execute(select(ar).where(ar.c.session_id.in_(chunk))).mappings().all()
+            trials += conn.execute(select(st).where(st.c.session_id.in_(chunk))).mappings().all()
+
+    if not sessions:
+        return {}
+
+    with dst.begin() as conn:
+        new_ids = conn.execute(
+            gs.insert().returning(gs.c.id, sort_by_parameter_order=True),
+            [{k: v for k, v in s.items() if k != "id"} for s in sessions]
+        ).scalars().all()
+        id_map = dict(zip(ids, new_ids))
+        conn.execute(log.insert(), [
+            {"user_id": user_id, "old_session_id": old, "new_session_id": new}
+            for old, new in id_map.items()
+        ])
+        if analyses:
+            conn.execute(ar.insert(), [
+                {**{k: v for k, v in a.items() if k != "id"}, "session_id": id_map[a["session_id"]]}
+                for a in analyses
+            ])
+        if trials:
+            conn.execute(st.insert(), [
+                {**dict(t), "session_id": id_map[t["session_id"]]} for t in trials
+            ])
+    return id_map
+
+
+def _delete_user_rows(conn, user_id):
+    gs = GameSession.__table__
+    ids = select(gs.c.id).where(gs.c.user_id == user_id).scalar_subquery()
+    conn.execute(delete(SessionTrials.__table__).where(SessionTrials.__table__.c.session_id.in_(ids)))
+    conn.execute(delete(AnalysisResult.__table__).where(AnalysisResult.__table__.c.session_id.in_(ids)))
+    conn.execute(delete(gs).where(gs.c.user_id == user_id))
+
+
+def _finish_move(row, src, to_shard):
+    from backend.utils.response_cache import bump_user_version
+
+    user_id = row.user_id
+    dst = shard_engine(to_shard)
+    id_map = _copy_user(src, dst, user_id)
+    with src.begin() as conn:
+        _delete_user_rows(conn, user_id)
+    with dst.begin() as conn:
+        conn.execute(delete(ShardMoveLog.__table__).where(ShardMoveLog.__table__.c.user_id == user_id))
+
+    # Session ids are per shard: repoint what the primary references, in
+    # one statement so chains like 1 -> 2, 2 -> 3 aren't applied twice.
+    # (Entries written on the destination before an import-primary may
+    # share an id with a primary session; those are ambiguous.)
+    remap = {old: new for old, new in id_map.items() if old != new}
+    if remap:
+        db.session.execute(
+            update(LeaderboardEntry)
+            .where(LeaderboardEntry.user_id == user_id, LeaderboardEntry.session_id.in_(remap))
+            .values(session_id=case(remap, value=LeaderboardEntry.session_id))
+        )
+    row.shard = to_shard
+    row.state = "active"
+    row.updated_at = datetime.utcnow()
+    bump_user_version(user_id)
+    db.session.commit()
+
+    with _directory_lock:
+        _directory.pop(user_id, None)
+    return len(id_map)
+
+
+def move_users(targets, from_engine=None, wait=True):
+    """Moves users' sessions to their target shards and repoints the
+    directory. `targets`: {user_id: shard index}.
+
+    Every user to move is set to "moving" in one commit first; requests for
+    them get a 503 until their move finishes. With `wait`, copying starts
+    once every worker's cached directory entry has expired (one wait for
+    the whole batch). Rows a user already has on the target are kept; an
+    interrupted run can be repeated with the same targets.
+    Returns {user_id: sessions moved}.
+    """
+    user_ids = sorted(targets)
+    rows = {}
+    for i in range(0, len(user_ids), 500):
+        chunk = user_ids[i:i + 500]
+        rows.update({r.user_id: r for r in UserShard.query.filter(UserShard.user_id.in_(chunk))})
+
+    pending = []
+    now = datetime.utcnow()
+    for user_id in user_ids:
+        row = rows.get(user_id)
+        if row is None:
+            row = UserShard(user_id=user_id, shard=targets[user_id])
+            db.session.add(row)
+        src = from_engine or shard_engine(row.shard)
+        dst = shard_engine(targets[user_id])
+        if src is dst:
+            row.state = "active"
+            continue
+        row.state = "moving"
+        row.updated_at = now
+        pending.append((row, src, targets[user_id]))
+    db.session.commit()
+
+    if wait and pending:
+        print(f"waiting {SHARD_DIRECTORY_TTL + 1:.0f}s for directory caches")
+        time.sleep(SHARD_DIRECTORY_TTL + 1)
+
+    moved = {}
+    for row, src, to_shard in pending:
+        src_label = "primary" if src is db.engine else f"shard {row.shard}"
+        n = _finish_move(row, src, to_shard)
+        print(f"user {row.user_id}: {src_label} -> shard {to_shard} ({n} sessions)")
+        moved[row.user_id] = n
+    return moved
+
+
+def move_user(user_id, to_shard, from_engine=None, wait=True):
+    return move_users({user_id: to_shard}, from_engine, wait).get(user_id, 0)
+
+
+def rebalance(wait=True):
+    """Moves every user whose pinned shard differs from the ring's choice
+    (e.g. after adding shards)."""
+    targets = {}
+    for row in UserShard.query.order_by(UserShard.user_id).all():
+        target = ring.shard_for(row.user_id)
+        if row.shard != target:
+            targets[row.user_id] = target
+    moved = move_users(targets, wait=wait)
+    print(f"rebalanced {len(moved)} users")
+
+
+def import_primary(wait=True):
+    """Moves pre-sharding rows from the primary onto each user's shard
+    (the pinned one, for users who already have a directory row)."""
+    gs = GameSession.__table__
+    with db.engine.connect() as conn:
+        user_ids = conn.execute(select(gs.c.user_id).distinct()).scalars().all()
+
+    pinned = {r.user_id: r.shard for r in UserShard.query.all()}
+    targets = {u: pinned.get(u, ring.shard_for(u)) for u in user_ids}
+    moved = move_users(targets, from_engine=db.engine, wait=wait)
+    print(f"imported {sum(moved.values())} sessions for {len(moved)} users")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PlayWell shard management")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("init", help="create sharded tables on every shard")
+    p = sub.add_parser("import-primary", help="move existing session rows off the primary")
+    p.add_argument("--no-wait", action="store_true",
+                   help="don't wait for worker directory caches (offline use)")
+    p = sub.add_parser("move", help="move one user to a shard")
+    p.add_argument("--user", type=int, required=True)
+    p.add_argument("--to", type=int, required=True)
+    p.add_argument("--no-wait", action="store_true",
+                   help="don't wait for worker directory caches (offline use)")
+    p = sub.add_parser("rebalance", help="move users to the ring's current placement")
+    p.add_argument("--no-wait", action="store_true")
+    args = parser.parse_args(argv)
+
+    if not sharding_enabled():
+        raise SystemExit("DATABASE_SHARD_URLS is not set")
+
+    from backend.app import create_app
+    app = create_app()
+    with app.app_context():
+        if args.command == "init":
+            db.create_all()
+            create_shard_tables()
+        elif args.command == "import-primary":
+            import_primary(wait=not args.no_wait)
+        elif args.command == "move":
+            if not 0 <= args.to < len(DATABASE_SHARD_URLS):
+                raise SystemExit(f"--to must be in 0..{len(DATABASE_SHARD_URLS) - 1}")
+            if not db.session.get(User, args.user):
+                raise SystemExit(f"user {args.user} not found")
+            move_user(args.user, args.to, wait=not args.no_wait)
+        else:
+            rebalance(wait=not args.no_wait)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# backend/trials.py
+#
+# Trial-level reaction data: extraction from the client's `meta`, compact
+# binary packing, and vectorized summaries.
+#
+# Reaction times are stored as little-endian float32 (4 bytes/trial) and
+# correctness as uint8 (1 byte/trial); decoding is a zero-copy
+# np.frombuffer over the stored bytes.
+
+import numpy as np
+
+from backend.models.game_model import SessionTrials
+
+RT_DTYPE = np.dtype("<f4")
+CORRECT_DTYPE = np.dtype("u1")
+
+MAX_TRIALS = 1000
+
+# A trial slower than this multiple of the session median counts as a lapse
+LAPSE_FACTOR = 2.0
+
+
+def _flatten(values):
+    out = []
+    for v in values:
+        if isinstance(v, (list, tuple)):
+            out.extend(_flatten(v))
+        else:
+            out.append(v)
+    return out
+
+
+def _to_rt(value):
+    try:
+        rt = float(value)
+    except (TypeError, ValueError):
+        return None
+    return rt if np.isfinite(rt) else None
+
+
+def extract_trials(meta):
+    """Returns (reaction_ms, correct) numpy arrays (either may be None)
+    from the `meta` dict the games send with /game/submit.
+
+    With per-trial dicts the two arrays stay index-aligned: a trial with a
+    missing or invalid rt is dropped from both. Elements that aren't dicts
+    are ignored. Games sending separate reaction and answer lists give two
+    independent arrays."""
+    if not isinstance(meta, dict):
+        return None, None
+
+    rt_arr, correct_arr = None, None
+
+    trials = meta.get("trials")
+    if isinstance(trials, list) and trials and isinstance(trials[0], dict):
+        trials = [t for t in trials if isinstance(t, dict)][:MAX_TRIALS]
+        has_rt = any("rt" in t for t in trials)
+        has_correct = any("correct" in t for t in trials)
+        if has_rt:
+            trials = [t for t in trials if _to_rt(t.get("rt")) is not None]
+            rt_arr = np.asarray([_to_rt(t["rt"]) for t in trials], dtype=RT_DTYPE)
+        if has_correct:
+            correct_arr = np.asarray([bool(t.get("correct")) for t in trials], dtype=CORRECT_DTYPE)
+        return rt_arr, correct_arr
+
+    for key in ("reactionTimes", "raw_events"):
+        if isinstance(meta.get(key), list):
+            rts = [_to_rt(v) for v in meta[key][:MAX_TRIALS]]
+            rt_arr = np.asarray([v for v in rts if v is not None], dtype=RT_DTYPE)
+            break
+
+    # Memory games send the target and the player's answer
+    for target_key, answer_key in (("sequence", "userSeq"), ("grid", "userGrid"),
+                                   ("memorySequence", "userMemoryInput")):
+        target, answer = meta.get(target_key), meta.get(answer_key)
+        if isinstance(target, list) and isinstance(answer, list):
+            target, answer = _flatten(target), _flatten(answer)
+            n = min(len(target), len(answer), MAX_TRIALS)
+            correct_arr = np.asarray([target[i] == answer[i] for i in range(n)], dtype=CORRECT_DTYPE)
+            break
+
+    return rt_arr, correct_arr
+
+
+def pack(arr):
+    return arr.tobytes() if arr is not None and len(arr) else None
+
+
+def unpack_rt(blob):
+    return np.frombuffer(memoryview(blob), dtype=RT_DTYPE) if blob else np.empty(0, RT_DTYPE)
+
+
+def unpack_correct(blob):
+    return np.frombuffer(memoryview(blob), dtype=CORRECT_DTYPE) if blob else np.empty(0, CORRECT_DTYPE)
+
+
+def summarize(rt, correct):
+    summary = {
+        "rt_mean": None, "rt_median": None, "rt_sd": None,
+        "rt_iqr": None, "lapses": None, "accuracy": None,
+    }
+
+    if rt is not None and len(rt):
+        x = rt.astype(np.float64)
+        q1, median, q3 = np.percentile(x, [25, 50, 75])
+        summary.update({
+            "rt_mean": float(x.mean()),
+            "rt_median": float(median),
+            "rt_sd": float(x.std(ddof=1)) if len(x) > 1 else 0.0,
+            "rt_iqr": float(q3 - q1),
+            "lapses": int(np.count_nonzero(x > LAPSE_FACTOR * median)),
+        })
+
+    if correct is not None and len(correct):
+        summary["accuracy"] = float(correct.mean())
+
+    return summary
+
+
+def build_trials_row(session_id, meta):
+    """A SessionTrials row for this submit, or None when meta has no trials."""
+    rt, correct = extract_trials(meta)
+    if (rt is None or not len(rt)) and (correct is None or not len(correct)):
+        return None
+
+    return SessionTrials(
+        session_id=session_id,
+        n_trials=max(len(rt) if rt is not None else 0,
+                     len(correct) if correct is not None else 0),
+        reaction_ms=pack(rt),
+        correct=pack(correct),
+        **summarize(rt, correct)
+    )
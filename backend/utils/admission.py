@@ -0,0 +1,230 @@
+# backend/utils/admission.py
+#
+# Admission control for the expensive routes:
+#   - rate_limited: per-user token bucket (JWT identity, or client IP for guests)
+#   - admission_control: per-route concurrency limit with a bounded wait queue
+#
+# Both keep their state in the shared SQLite store so the limits hold
+# across all gunicorn workers on a host. If the store is unavailable the
+# request is let through (fail open).
+
+import math
+import os
+import time
+from functools import wraps
+
+from flask import g, request, jsonify
+
+from backend.config import (
+    ADMISSION_ENABLED,
+    ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_RETRY_AFTER,
+)
+from backend.utils.shared_store import transaction
+
+POLL_INTERVAL = 0.02
+BUCKET_IDLE_TTL = 3600
+PRUNE_INTERVAL = 60
+
+_last_prune = 0.0
+
+
+def client_key():
+    user = getattr(g, "current_user", None)
+    if user is not None:
+        return f"user:{user.id}"
+    # Proxy hops are resolved by ProxyFix (PLAYWELL_TRUSTED_PROXY_HOPS);
+    # the raw X-Forwarded-For header is client-controlled
+    return f"ip:{request.remote_addr or 'unknown'}"
+
+
+def too_many_requests(retry_after):
+    resp = jsonify({"error": "Too many requests"})
+    resp.status_code = 429
+    resp.headers["Retry-After"] = str(max(1, int(math.ceil(retry_after))))
+    return resp
+
+
+def service_busy(retry_after=ADMISSION_RETRY_AFTER):
+    resp = jsonify({"error": "Server busy, please retry"})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = str(retry_after)
+    return resp
+
+
+# ---------------------------------------------------------------------------
+# Token bucket
+# ---------------------------------------------------------------------------
+
+def take_token(key, rate, burst):
+    """Returns (allowed, retry_after_seconds)."""
+    global _last_prune
+    now = time.time()
+
+    with transaction() as conn:
+        row = conn.execute(
+            "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+        ).fetchone()
+
+        tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+
+        if tokens >= 1:
+            tokens -= 1
+            allowed, retry_after = True, 0.0
+        else:
+            allowed, retry_after = False, (1 - tokens) / rate
+
+        conn.execute(
+            "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+            (key, tokens, now)
+        )
+
+        if now - _last_prune > PRUNE_INTERVAL:
+            conn.execute(
+                "DELETE FROM buckets WHERE updated < ?", (now - BUCKET_IDLE_TTL,)
+            )
+            _last_prune = now
+
+    return allowed, retry_after
+
+
+def rate_limited(scope, rate, burst):
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if ADMISSION_ENABLED:
+                try:
+                    allowed, retry_after = take_token(
+                        f"{scope}:{client_key()}", rate, burst
+                    )
+                except Exception as e:
+                    print("rate limiter error:", e)
+                    allowed, retry_after = True, 0.0
+
+                if not allowed:
+                    return too_many_requests(retry_after)
+
+            return f(*args, **kwargs)
+
+        return decorated
+
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Concurrency slots
+# ---------------------------------------------------------------------------
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _purge_dead_workers(conn, route):
+    pids = [r[0] for r in conn.execute(
+        "SELECT pid FROM slots WHERE route = ?", (route,)
+    )]
+    for pid in pids:
+        if pid != os.getpid() and not _pid_alive(pid):
+            conn.execute(
+                "DELETE FROM slots WHERE route = ? AND pid = ?", (route, pid)
+            )
+
+
+def _bump(conn, route, inflight=0, waiting=0):
+    conn.execute(
+        "INSERT OR IGNORE INTO slots (route, pid) VALUES (?, ?)",
+        (route, os.getpid())
+    )
+    conn.execute(
+        "UPDATE slots SET inflight = inflight + ?, waiting = waiting + ? "
+        "WHERE route = ? AND pid = ?",
+        (inflight, waiting, route, os.getpid())
+    )
+
+
+def _usage(conn, route):
+    row = conn.execute(
+        "SELECT COALESCE(SUM(inflight), 0), COALESCE(SUM(waiting), 0) "
+        "FROM slots WHERE route = ?",
+        (route,)
+    ).fetchone()
+    return row[0], row[1]
+
+
+def acquire_slot(route, max_concurrent, max_queue, timeout=ADMISSION_QUEUE_TIMEOUT):
+    with transaction() as conn:
+        inflight, waiting = _usage(conn, route)
+        if inflight >= max_concurrent:
+            # Only pay for the liveness scan when we're about to queue/reject
+            _purge_dead_workers(conn, route)
+            inflight, waiting = _usage(conn, route)
+
+        if inflight < max_concurrent:
+            _bump(conn, route, inflight=1)
+            return True
+
+        if waiting >= max_queue:
+            return False
+
+        _bump(conn, route, waiting=1)
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        with transaction() as conn:
+            inflight, _ = _usage(conn, route)
+            if inflight < max_concurrent:
+                _bump(conn, route, inflight=1, waiting=-1)
+                return True
+
+    with transaction() as conn:
+        _bump(conn, route, waiting=-1)
+    return False
+
+
+def release_slot(route):
+    with transaction() as conn:
+        _bump(conn, route, inflight=-1)
+
+
+def admission_control(route, max_concurrent, max_queue, fallback=None):
+    """Limits concurrent executions of a route across workers.
+
+    When all slots are busy the request waits in a bounded queue for up to
+    ADMISSION_QUEUE_TIMEOUT seconds. If the queue is full or the wait times
+    out, `fallback(*args, **kwargs)` is served when given, else a 503.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if not ADMISSION_ENABLED:
+                return f(*args, **kwargs)
+
+            try:
+                admitted = acquire_slot(route, max_concurrent, max_queue)
+            except Exception as e:
+                print("admission control error:", e)
+                return f(*args, **kwargs)
+
+            if not admitted:
+                if fallback is not None:
+                    return fallback(*args, **kwargs)
+                return service_busy()
+
+            try:
+                return f(*args, **kwargs)
+            finally:
+                try:
+                    release_slot(route)
+                except Exception as e:
+                    print("admission release error:", e)
+
+        return decorated
+
+    return decorator
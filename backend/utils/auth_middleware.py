@@ -1,9 +1,10 @@
 # backend/utils/auth_middleware.py
 
 from functools import wraps
-from flask import request, jsonify
+from flask import g, request, jsonify
 from backend.models.user_model import User
 from backend.config import SECRET_KEY
+from backend.sharding import use_user_shard
 import jwt
 
 def token_required(f):
@@ -29,6 +30,15 @@ def token_required(f):
             print("token decode error:", e)
             return jsonify({"error": "Invalid or expired token"}), 401
 
+        # Exposed for request-scoped helpers (rate limiting, caching)
+        g.current_user = current_user
+
+        # Session tables for this request live on the user's shard
+        if not use_user_shard(current_user.id):
+            response = jsonify({"error": "Account is being migrated, retry shortly"})
+            response.headers["Retry-After"] = "5"
+            return response, 503
+
         return f(current_user, *args, **kwargs)
 
     return decorated
@@ -0,0 +1,34 @@
+# backend/utils/offload.py
+#
+# Runs CPU-bound callables without stalling the worker.
+#
+# Under gevent workers the call is moved to a real OS thread from the hub's
+# threadpool, so other greenlets keep serving I/O-bound requests. Under
+# sync/gthread workers it runs inline, gated by a semaphore so many request
+# threads can't oversubscribe the CPU with concurrent inference.
+
+import threading
+
+from backend.config import CPU_POOL_SIZE
+
+_slots = threading.BoundedSemaphore(CPU_POOL_SIZE)
+
+
+def gevent_active():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("threading")
+
+
+def offload(fn, *args, **kwargs):
+    if gevent_active():
+        import gevent
+        pool = gevent.get_hub().threadpool
+        if pool.maxsize != CPU_POOL_SIZE:
+            pool.maxsize = CPU_POOL_SIZE
+        return pool.apply(fn, args, kwargs)
+
+    with _slots:
+        return fn(*args, **kwargs)
@@ -0,0 +1,68 @@
+# backend/utils/read_routing.py
+#
+# Marks read-only views so their queries go to a read replica.
+#
+# Read-your-writes: if the user changed their data in the last
+# REPLICA_STICKY_SECONDS (UserDataVersion.updated_at, read from the
+# primary), the request stays on the primary so submit -> history is
+# consistent even while replicas lag. Past that window, one replica is
+# pinned for the request and used only if its UserDataVersion.version has
+# caught up with the primary's; responses built from it are then safe to
+# cache under that version (see response_cache.py).
+
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import g
+
+from backend.config import DATABASE_REPLICA_URLS, REPLICA_STICKY_SECONDS
+from backend.database import db, replica_router
+from backend.models.user_model import UserDataVersion
+
+
+def _primary_version(user_id):
+    return db.session.execute(
+        db.select(UserDataVersion.version, UserDataVersion.updated_at)
+        .where(UserDataVersion.user_id == user_id)
+    ).first()
+
+
+def caught_up_replica(user_id):
+    """A replica whose copy of the user's data matches the primary, or
+    None (the request should stay on the primary)."""
+    row = _primary_version(user_id)
+    if row is not None and datetime.utcnow() - row.updated_at < timedelta(seconds=REPLICA_STICKY_SECONDS):
+        return None  # wrote recently
+
+    replica = replica_router.choose(db.engines)
+    if replica is None:
+        return None
+    try:
+        with replica.connect() as conn:
+            version = conn.execute(
+                db.select(UserDataVersion.version)
+                .where(UserDataVersion.user_id == user_id)
+            ).scalar()
+    except Exception as e:
+        print("replica version check failed:", e)
+        return None
+
+    primary = row.version if row is not None else None
+    return replica if version == primary else None
+
+
+def replica_reads(f):
+    """For routes shaped like `view(current_user, ...)`."""
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        replica = caught_up_replica(current_user.id) if DATABASE_REPLICA_URLS else None
+        if replica is None:
+            return f(current_user, *args, **kwargs)
+
+        g.replica = replica
+        try:
+            return f(current_user, *args, **kwargs)
+        finally:
+            g.replica = None
+
+    return decorated
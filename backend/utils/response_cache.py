@@ -0,0 +1,181 @@
+# backend/utils/response_cache.py
+#
+# Conditional GET + per-user response cache for dashboard endpoints.
+#
+# Every change to a user's data bumps UserDataVersion.version (same
+# transaction as the change). Cached responses and ETags are derived from
+# that version, so an unchanged dashboard costs one primary-key lookup and
+# either a 304 or a cached (pre-compressed) body.
+
+import gzip
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+
+from flask import request, make_response
+
+from backend.config import RESPONSE_CACHE_BYTES, RESPONSE_CACHE_MAX_ENTRY, COMPRESS_MIN_SIZE
+from backend.database import db, upsert
+from backend.models.user_model import UserDataVersion
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+_cache = OrderedDict()
+_cache_bytes = 0  # bodies + compressed variants of everything in _cache
+_cache_lock = threading.Lock()
+
+
+def bump_user_version(user_id):
+    # Call before committing the change it describes. A single upsert, so
+    # concurrent first writes for a user don't race on the insert.
+    now = datetime.utcnow()
+    stmt = upsert(UserDataVersion).values(user_id=user_id, version=1, updated_at=now)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[UserDataVersion.user_id],
+        set_={"version": UserDataVersion.version + 1, "updated_at": now}
+    ))
+
+
+def get_user_version(user_id):
+    row = db.session.get(UserDataVersion, user_id)
+    return row.version if row else 0
+
+
+def _pick_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def _cache_get(key, etag):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None or entry["etag"] != etag:
+            return None
+        _cache.move_to_end(key)
+        return entry
+
+
+def _entry_size(entry):
+    return len(entry["body"]) + sum(len(b) for b in entry["encoded"].values())
+
+
+def _evict():
+    # Caller holds _cache_lock
+    global _cache_bytes
+    while _cache_bytes > RESPONSE_CACHE_BYTES and _cache:
+        _, old = _cache.popitem(last=False)
+        _cache_bytes -= _entry_size(old)
+
+
+def _cache_put(entry):
+    global _cache_bytes
+    if len(entry["body"]) > RESPONSE_CACHE_MAX_ENTRY:
+        return
+    with _cache_lock:
+        key = entry["key"]
+        old = _cache.pop(key, None)
+        if old is not None:
+            _cache_bytes -= _entry_size(old)
+        _cache[key] = entry
+        _cache_bytes += _entry_size(entry)
+        _evict()
+
+
+def _cache_add_encoded(entry, encoding, body):
+    global _cache_bytes
+    with _cache_lock:
+        if encoding in entry["encoded"]:
+            return
+        entry["encoded"][encoding] = body
+        # Only count it while the entry is still cached
+        if _cache.get(entry["key"]) is entry:
+            _cache_bytes += len(body)
+            _evict()
+
+
+def _build_response(entry):
+    encoding = _pick_encoding() if len(entry["body"]) >= COMPRESS_MIN_SIZE else None
+
+    if encoding:
+        with _cache_lock:
+            body = entry["encoded"].get(encoding)
+        if body is None:
+            body = _compress(entry["body"], encoding)
+            _cache_add_encoded(entry, encoding, body)
+    else:
+        body = entry["body"]
+
+    resp = make_response(body, 200)
+    resp.mimetype = entry["mimetype"]
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    resp.headers["Vary"] = "Accept-Encoding, Authorization"
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp.set_etag(entry["etag"], weak=True)
+    return resp
+
+
+def _not_modified(etag):
+    resp = make_response("", 304)
+    resp.headers["Vary"] = "Accept-Encoding, Authorization"
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp.set_etag(etag, weak=True)
+    return resp
+
+
+def cached_user_response(kind, variant=None):
+    """For routes shaped like `view(current_user, user_id)`.
+
+    `variant` is an optional callable whose result is folded into the ETag,
+    for responses that also depend on time (e.g. rolling windows).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user, user_id, *args, **kwargs):
+            # Leave authorization errors to the view itself
+            if current_user.id != user_id:
+                return f(current_user, user_id, *args, **kwargs)
+
+            version = get_user_version(user_id)
+            tag = f"{kind}-{user_id}-{version}"
+            if variant is not None:
+                tag = f"{tag}-{variant()}"
+
+            if request.if_none_match.contains_weak(tag):
+                return _not_modified(tag)
+
+            key = (kind, user_id)
+            entry = _cache_get(key, tag)
+            if entry is None:
+                resp = make_response(f(current_user, user_id, *args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+
+                entry = {
+                    "key": key,
+                    "etag": tag,
+                    "body": resp.get_data(),
+                    "mimetype": resp.mimetype,
+                    "encoded": {}
+                }
+                _cache_put(entry)
+
+            return _build_response(entry)
+
+        return decorated
+
+    return decorator
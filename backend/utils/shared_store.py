@@ -0,0 +1,86 @@
+# backend/utils/shared_store.py
+#
+# Small SQLite file shared by all gunicorn workers on the same host.
+# Used for state that must be consistent across workers (rate limits,
+# in-flight counters, drift histograms) but does not belong in the main
+# database.
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from backend.config import SHARED_STORE_PATH
+
+_local = threading.local()
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS buckets (
+        key TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS slots (
+        route TEXT NOT NULL,
+        pid INTEGER NOT NULL,
+        inflight INTEGER NOT NULL DEFAULT 0,
+        waiting INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (route, pid)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS drift_counts (
+        window_start INTEGER NOT NULL,
+        feature TEXT NOT NULL,
+        bin INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (window_start, feature, bin)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS drift_scores (
+        window_start INTEGER PRIMARY KEY,
+        computed_at REAL NOT NULL,
+        payload TEXT NOT NULL
+    )
+    """,
+]
+
+
+def get_connection():
+    # One connection per thread and per process (connections must not
+    # cross a fork).
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "pid", None) == os.getpid():
+        return conn
+
+    conn = sqlite3.connect(
+        SHARED_STORE_PATH,
+        timeout=5.0,
+        isolation_level=None,
+        check_same_thread=False
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    for stmt in SCHEMA:
+        conn.execute(stmt)
+
+    _local.conn = conn
+    _local.pid = os.getpid()
+    return conn
+
+
+@contextmanager
+def transaction():
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    else:
+        conn.execute("COMMIT")